@@ -1,61 +1,436 @@
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import FileResponse
-import pandas as pd
-import pickle
+from datetime import datetime, timezone
+from typing import List, Optional
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+import atexit
+import json
 import os
 import re
+import threading
+import time
+from collections import Counter, OrderedDict
+
+from utils.article_cache import ArticleCache, AnalysisCache
+from utils.company_list import load_companies
+from utils.gemini_service import GeminiService
+from utils.metrics import metrics
+from utils.news_scraper import iter_news
+from utils.report_cache import ReportCache, etag_matches, make_etag
+from utils.report_store import ReportStore
+from utils.text_to_speech import TTSJobManager
+
+
+class RequestMetricsMiddleware:
+    """
+    Plain ASGI middleware (no per-request task or body buffering) that times every request by
+    route template and counts responses by status. Streaming responses are timed to the last byte.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = getattr(scope.get("route"), "path", "unmatched")
+            metrics.observe("http_request", time.perf_counter() - start, route=route, method=scope["method"])
+            metrics.inc("http_responses", route=route, status=status)
+
 
 app = FastAPI()
+app.add_middleware(RequestMetricsMiddleware)
+report_store = ReportStore(os.environ.get("REPORT_DB", os.path.join('data', 'reports.db')))
+# Serialized reports kept in memory, refreshed when cron stores a newer run
+report_cache = ReportCache(report_store, max_entries=int(os.environ.get("REPORT_CACHE_SIZE", 512)))
+# Background, single-flight TTS generation (handlers never wait on translate/gTTS)
+tts_jobs = TTSJobManager()
+# Used by the live endpoint; shares the on-disk caches with cron
+article_cache = ArticleCache()
+analysis_service = GeminiService(api_key=os.environ.get("GEMINI_API_KEY"), result_cache=AnalysisCache())
+
+
+def _timestamp(value):
+    """Convert an optional query datetime to a unix timestamp (naive values are taken as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _isoformat(timestamp):
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc).isoformat()
+
+
+def _split_names(values):
+    """Flatten repeated and comma-separated query values, dropping blanks and duplicates."""
+    names = (name.strip() for value in values or [] for name in value.split(","))
+    return list(dict.fromkeys(name for name in names if name))
+
+
+def _stream_event(event, data, sse=False):
+    """Encode one live-report event as an NDJSON line or a server-sent event."""
+    if sse:
+        return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+    return json.dumps({"event": event, **data}, ensure_ascii=False) + "\n"
+
+# Bulk endpoint cap (full reports), and the /reports/summary fields: query name -> response key
+MAX_BULK_REPORTS = 200
+SUMMARY_FIELDS = {
+    "distribution": "Sentiment Distribution",
+    "final_sentiment": "Final Sentiment Analysis",
+    "run_id": "run_id",
+    "updated_at": "updated_at",
+}
+DEFAULT_SUMMARY_FIELDS = ("distribution", "final_sentiment")
+# Serialized index responses (summary pages, trending topics) by ETag; the ETag includes the
+# store version, so entries never go stale
+_index_bodies = OrderedDict()
+_index_lock = threading.Lock()
+MAX_INDEX_BODIES = 32
+
+
+def _cached_body(etag):
+    with _index_lock:
+        return _index_bodies.get(etag)
+
+
+def _cache_body(etag, body):
+    with _index_lock:
+        _index_bodies[etag] = body
+        while len(_index_bodies) > MAX_INDEX_BODIES:
+            _index_bodies.popitem(last=False)
+
+# Report requests per company, added to the store's hourly popularity buckets (which the cron
+# refresh daemon reads) at most every HITS_FLUSH_SECONDS and at exit
+HITS_FLUSH_SECONDS = float(os.environ.get("HITS_FLUSH_SECONDS", 30))
+_hits = Counter()
+_hits_lock = threading.Lock()
+_hits_flushed_at = time.monotonic()
+# Status file written by `cron.py --daemon`
+SCHEDULER_STATUS = os.environ.get("SCHEDULER_STATUS", os.path.join('data', 'output', 'scheduler_status.json'))
+
+
+def _flush_hits(force=False):
+    global _hits_flushed_at
+    with _hits_lock:
+        if not _hits or (not force and time.monotonic() - _hits_flushed_at < HITS_FLUSH_SECONDS):
+            return
+        counts = dict(_hits)
+        _hits.clear()
+        _hits_flushed_at = time.monotonic()
+    try:
+        report_store.add_hits(counts)
+    except Exception as e:
+        print(f"Could not record report requests: {e}")
+
+
+def _record_hit(company_name):
+    with _hits_lock:
+        _hits[company_name] += 1
+    _flush_hits()
+
+
+atexit.register(_flush_hits, force=True)
 
 @app.get("/")
 def read_root():
     return {"status": "OK", "message": "News Sentiment API is running."}
 
+@app.get("/metrics")
+def get_metrics():
+    """Counters and timings for this API process in the Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+@app.get("/scheduler")
+def get_scheduler_status():
+    """
+    Queue depth, freshness lag and most urgent companies of the cron refresh daemon (`cron.py
+    --daemon`), from its status file; age_seconds tells how old the snapshot is.
+    """
+    try:
+        with open(SCHEDULER_STATUS, encoding='utf-8') as f:
+            status = json.load(f)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="No refresh daemon status (is cron.py --daemon running?).")
+    except (OSError, ValueError) as e:
+        raise HTTPException(status_code=500, detail=f"Could not read refresh daemon status: {e}")
+    status.pop("metrics", None)
+    status["age_seconds"] = time.time() - status.get("updated_at", 0)
+    return status
+
 @app.get("/companies")
 def list_companies():
     """Get the list of companies available."""
     try:
-        df = pd.read_csv('data/company_list.csv')
-        companies = df['Company'].dropna().tolist()
+        companies = load_companies()
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Could not read company list: {e}")
     return {"companies": companies}
 
 @app.get("/report/{company_name}")
-def get_report(company_name: str):
-    """Get the sentiment analysis report for a given company."""
-    filename = re.sub(r'\W+', '_', company_name.lower())
-    file_path = os.path.join('data', 'output', f"{filename}.pkl")
-    if not os.path.exists(file_path):
-        raise HTTPException(status_code=404, detail="Report not found for the specified company.")
+def get_report(company_name: str, request: Request):
+    """Get the latest sentiment analysis report for a given company."""
     try:
-        with open(file_path, 'rb') as f:
-            data = pickle.load(f)
+        body, etag = report_cache.get(company_name)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Report not found for the specified company.")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error reading report: {e}")
-    return data
+    _record_hit(company_name)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@app.get("/reports")
+def get_reports(request: Request, companies: List[str] = Query(...)):
+    """
+    Get the latest full reports for several companies in one request (companies=A,B or repeated
+    companies=...). Companies without a report are listed under "missing".
+    """
+    names = _split_names(companies)
+    if not names:
+        raise HTTPException(status_code=400, detail="No companies given.")
+    if len(names) > MAX_BULK_REPORTS:
+        raise HTTPException(status_code=400,
+                            detail=f"At most {MAX_BULK_REPORTS} companies per request; use /reports/summary for more.")
+    try:
+        found = report_cache.get_many(names)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading reports: {e}")
+    # Splice the cached report bytes in as-is instead of decoding and re-encoding them
+    parts = [json.dumps(name, ensure_ascii=False).encode("utf-8") + b":" + found[name][0]
+             for name in names if name in found]
+    missing = json.dumps([name for name in names if name not in found], ensure_ascii=False).encode("utf-8")
+    body = b'{"reports":{' + b",".join(parts) + b'},"missing":' + missing + b"}"
+    etag = make_etag(body)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag})
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@app.get("/reports/summary")
+def get_reports_summary(request: Request, companies: Optional[List[str]] = Query(None),
+                        fields: Optional[List[str]] = Query(None), limit: int = 1000, offset: int = 0):
+    """
+    Get the latest sentiment distribution and final sentiment of every company (or of the given
+    companies), ordered by company, from the store's latest-run index. `fields` selects among
+    distribution, final_sentiment, run_id and updated_at; `limit` (max 10000) and `offset` page
+    through the list. The ETag only changes when some company gets a new run.
+    """
+    names = _split_names(companies) or None
+    selected = _split_names(fields) or list(DEFAULT_SUMMARY_FIELDS)
+    unknown = [name for name in selected if name not in SUMMARY_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown field(s): {', '.join(unknown)} "
+                                                    f"(expected {', '.join(SUMMARY_FIELDS)}).")
+    limit = max(1, min(limit, 10000))
+    offset = max(0, offset)
+    try:
+        # Answer unchanged polls before touching the rows
+        version = report_store.latest_version()
+        etag = make_etag(json.dumps([version, names, selected, limit, offset]).encode("utf-8"))
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        body = _cached_body(etag)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"ETag": etag})
+        total, rows = report_store.summaries(names, limit=limit, offset=offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading summaries: {e}")
+    items = []
+    for row in rows:
+        values = {
+            "distribution": {"Positive": row["positive"], "Negative": row["negative"], "Neutral": row["neutral"]},
+            "final_sentiment": row["final_sentiment"],
+            "run_id": row["run_id"],
+        }
+        item = {"Company": row["company"]}
+        for name in selected:
+            if name == "updated_at":
+                item["updated_at"] = _isoformat(row["created_at"])
+            else:
+                item[SUMMARY_FIELDS[name]] = values[name]
+        items.append(item)
+    body = json.dumps({"total": total, "limit": limit, "offset": offset, "companies": items},
+                      ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _cache_body(etag, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@app.get("/report/{company_name}/live")
+def get_report_live(company_name: str, num_articles: int = 10, format: str = "ndjson"):
+    """
+    Scrape and analyze a company now, streaming events as articles arrive (NDJSON, or SSE with
+    format=sse): one "article" event per article with the running sentiment distribution and
+    topic overlap, then a "done" event with the full report, which is also saved to the store.
+    """
+    num_articles = max(1, min(num_articles, 50))
+    sse = format == "sse"
+
+    def events():
+        yield _stream_event("start", {"company": company_name}, sse)
+        analysis = analysis_service.start_analysis(company_name)
+        for art in iter_news(company_name, num_articles=num_articles, cache=article_cache):
+            article_result = analysis.add(art)
+            yield _stream_event("article", {
+                "index": len(analysis.articles),
+                "article": article_result,
+                "Sentiment Distribution": analysis.sentiment_distribution(),
+                "Topic Overlap": analysis.topic_overlap(),
+            }, sse)
+        if not analysis.articles:
+            yield _stream_event("done", {"report": None, "detail": "No articles found for the specified company."}, sse)
+            return
+        report = analysis.result()
+        run_id = report_store.save_report(company_name, report)
+        yield _stream_event("done", {"run_id": run_id, "report": report}, sse)
+
+    media_type = "text/event-stream" if sse else "application/x-ndjson"
+    return StreamingResponse(events(), media_type=media_type,
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.get("/report/{company_name}/history")
+def get_report_history(company_name: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                       limit: int = 100, offset: int = 0):
+    """Get past runs for a company (newest first): sentiment distribution and summary per run."""
+    limit = max(1, min(limit, 1000))
+    runs = report_store.history(company_name, since=_timestamp(since), until=_timestamp(until),
+                                limit=limit, offset=max(0, offset))
+    if not runs and offset == 0 and report_store.latest_run_id(company_name) is None:
+        raise HTTPException(status_code=404, detail="Report not found for the specified company.")
+    for run in runs:
+        run["created_at"] = _isoformat(run["created_at"])
+    return {"company": company_name, "runs": runs, "limit": limit, "offset": offset}
+
+@app.get("/report/{company_name}/articles")
+def get_report_articles(company_name: str, since: Optional[datetime] = None, until: Optional[datetime] = None,
+                        sentiment: Optional[str] = None, limit: int = 100, offset: int = 0):
+    """Get analyzed articles for a company across runs in a time range (newest first)."""
+    limit = max(1, min(limit, 1000))
+    articles = report_store.articles(company_name, since=_timestamp(since), until=_timestamp(until),
+                                     sentiment=sentiment, limit=limit, offset=max(0, offset))
+    for article in articles:
+        article["created_at"] = _isoformat(article["created_at"])
+    return {"company": company_name, "articles": articles, "limit": limit, "offset": offset}
+
+@app.get("/topics/trending")
+def get_trending_topics(request: Request, since: Optional[datetime] = None, hours: Optional[float] = None,
+                        min_companies: int = 2, limit: int = 20):
+    """
+    Get the topics shared by the most companies in their latest reports (optionally only reports
+    from the last `hours`, to the minute, or since a time), with article counts by sentiment.
+    """
+    since = _timestamp(since)
+    if since is None and hours is not None:
+        since = (time.time() - max(0.0, hours) * 3600) // 60 * 60
+    limit = max(1, min(limit, 500))
+    min_companies = max(1, min_companies)
+    try:
+        # Ranking every topic scans the index, so the answer is cached until the store changes
+        version = report_store.latest_version()
+        etag = make_etag(json.dumps(["trending", version, since, min_companies, limit]).encode("utf-8"))
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        body = _cached_body(etag)
+        if body is not None:
+            return Response(content=body, media_type="application/json", headers={"ETag": etag})
+        topics = report_store.trending_topics(since=since, min_companies=min_companies, limit=limit)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading topic index: {e}")
+    body = json.dumps({"topics": [{
+        "Topic": row["topic"],
+        "Companies": row["companies"],
+        "Articles": row["articles"],
+        "Sentiment Distribution": {"Positive": row["positive"], "Negative": row["negative"],
+                                   "Neutral": row["neutral"]},
+    } for row in topics], "limit": limit}, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    _cache_body(etag, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
+
+@app.get("/topics/{topic}")
+def get_topic(topic: str, since: Optional[datetime] = None, limit: int = 100, offset: int = 0):
+    """
+    Get the companies whose latest report discusses a topic (case-insensitive), with the
+    matching articles and their sentiment, ordered by company.
+    """
+    limit = max(1, min(limit, 1000))
+    offset = max(0, offset)
+    try:
+        total, companies = report_store.topic_companies(topic, since=_timestamp(since), limit=limit, offset=offset)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading topic index: {e}")
+    if total == 0:
+        raise HTTPException(status_code=404, detail="No reports mention the specified topic.")
+    results = []
+    for company in companies:
+        counts = {"Positive": 0, "Negative": 0, "Neutral": 0}
+        for article in company["articles"]:
+            if article["sentiment"] in counts:
+                counts[article["sentiment"]] += 1
+        results.append({
+            "Company": company["company"],
+            "run_id": company["run_id"],
+            "updated_at": _isoformat(company["created_at"]),
+            "Sentiment Distribution": counts,
+            "Articles": [{"Title": a["title"], "Sentiment": a["sentiment"]} for a in company["articles"]],
+        })
+    return {"topic": topic, "total": total, "companies": results, "limit": limit, "offset": offset}
+
+@app.get("/tts/jobs/{job_id}")
+def get_tts_job(job_id: str):
+    """Get the status of a background TTS job."""
+    if not re.fullmatch(r'[0-9a-f]{64}', job_id):
+        raise HTTPException(status_code=404, detail="Unknown TTS job.")
+    status = tts_jobs.status(job_id)
+    body = {"job": job_id, "status": status}
+    if status == "ready":
+        body["audio_url"] = f"/tts/audio/{job_id}"
+    elif status == "failed":
+        body["error"] = tts_jobs.error(job_id)
+    return body
+
+@app.get("/tts/audio/{job_id}")
+def get_tts_audio(job_id: str):
+    """Download generated TTS audio by job id."""
+    if not re.fullmatch(r'[0-9a-f]{64}', job_id) or tts_jobs.status(job_id) != "ready":
+        raise HTTPException(status_code=404, detail="Audio not available.")
+    return FileResponse(tts_jobs.path(job_id), media_type="audio/mpeg", filename=f"{job_id[:12]}_sentiment.mp3")
 
 @app.get("/tts/{company_name}")
 def get_tts(company_name: str):
-    """Get Hindi Text-to-Speech audio for the overall sentiment of the company."""
+    """
+    Get Hindi Text-to-Speech audio for the overall sentiment of the company.
+    Returns the MP3 if it is already generated; otherwise starts a background job and returns
+    202 with a status URL to poll.
+    """
     filename_base = re.sub(r'\W+', '_', company_name.lower())
-    pkl_path = os.path.join('data', 'output', f"{filename_base}.pkl")
-    if not os.path.exists(pkl_path):
+    try:
+        data = report_store.latest_report(company_name)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error reading report: {e}")
+    if data is None:
         raise HTTPException(status_code=404, detail="No analysis available for the specified company.")
-    mp3_path = os.path.join('data', 'output', f"{filename_base}_overall_sentiment_hi.mp3")
-    # Generate the audio if it doesn't exist yet
-    if not os.path.exists(mp3_path):
-        try:
-            with open(pkl_path, 'rb') as f:
-                data = pickle.load(f)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=f"Error reading report: {e}")
-        final_text = data.get("Final Sentiment Analysis")
-        if not final_text:
-            raise HTTPException(status_code=500, detail="No sentiment summary available for TTS.")
-        from utils.text_to_speech import text_to_speech_hindi
-        result = text_to_speech_hindi(final_text, mp3_path)
-        if not result:
-            raise HTTPException(status_code=500, detail="TTS conversion failed.")
-    # Return the MP3 file as response
-    return FileResponse(mp3_path, media_type="audio/mpeg", filename=f"{filename_base}_sentiment.mp3")
+    final_text = data.get("Final Sentiment Analysis")
+    if not final_text:
+        raise HTTPException(status_code=500, detail="No sentiment summary available for TTS.")
+    job_id = tts_jobs.submit(final_text)
+    status = tts_jobs.status(job_id)
+    if status == "ready":
+        # Return the MP3 file as response
+        return FileResponse(tts_jobs.path(job_id), media_type="audio/mpeg", filename=f"{filename_base}_sentiment.mp3",
+                            headers={"X-TTS-Job": job_id})
+    if status == "failed":
+        raise HTTPException(status_code=500, detail="TTS conversion failed.")
+    return JSONResponse(status_code=202, content={"job": job_id, "status": status,
+                                                  "status_url": f"/tts/jobs/{job_id}"})
@@ -0,0 +1,140 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.report_store import company_key
+
+# FastAPI backend used by the Streamlit app
+API_URL = os.environ.get("NEWS_API_URL", "http://localhost:8000").rstrip("/")
+# (connect, read) timeouts in seconds for every API call
+API_TIMEOUT = (3, float(os.environ.get("NEWS_API_TIMEOUT", 10)))
+# How long a prefetched report is served without asking the API again
+PREFETCH_TTL = 60
+
+
+class ApiClient:
+    """
+    Pooled, time-limited HTTP client for the News Sentiment API.
+    Reports are kept with their ETag, so refreshing an unchanged report costs a 304 instead of a
+    download and parse, and reports can be prefetched in the background so that switching to
+    them is served from memory.
+    """
+    def __init__(self, base_url=API_URL, timeout=API_TIMEOUT, prefetch_workers=2, max_reports=128):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.max_reports = max_reports
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=prefetch_workers + 4)
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+        self._reports = OrderedDict()  # company key -> (fetched_at, etag, data)
+        self._inflight = {}            # company key -> prefetch future
+        self._lock = threading.Lock()
+        self._prefetcher = ThreadPoolExecutor(max_workers=prefetch_workers, thread_name_prefix="prefetch")
+
+    def _get(self, path, **kwargs):
+        return self.session.get(self.base_url + path, timeout=self.timeout, **kwargs)
+
+    def companies(self):
+        """
+        The company list. Raises requests.RequestException if the API is unavailable.
+        """
+        resp = self._get("/companies")
+        resp.raise_for_status()
+        return resp.json().get("companies", [])
+
+    def report(self, company, max_age=PREFETCH_TTL):
+        """
+        The latest report for a company, or None if it has none. A report fetched (or prefetched)
+        less than max_age seconds ago is returned as is; older ones are revalidated by ETag.
+        Raises requests.RequestException if the API is unavailable.
+        """
+        key = company_key(company)
+        with self._lock:
+            future = self._inflight.get(key)
+        if future is not None:
+            try:
+                future.result(timeout=self.timeout[1])
+            except Exception:
+                pass  # fetch it below
+        with self._lock:
+            cached = self._reports.get(key)
+        if cached is not None and time.monotonic() - cached[0] < max_age:
+            return cached[2]
+        return self._fetch_report(company, key, cached)
+
+    def _fetch_report(self, company, key, cached):
+        headers = {"If-None-Match": cached[1]} if cached is not None and cached[1] else {}
+        resp = self._get(f"/report/{quote(company, safe='')}", headers=headers)
+        if resp.status_code == 304 and cached is not None:
+            data, etag = cached[2], cached[1]
+        elif resp.status_code == 404:
+            data, etag = None, None
+        else:
+            resp.raise_for_status()
+            data, etag = resp.json(), resp.headers.get("ETag")
+        with self._lock:
+            self._reports[key] = (time.monotonic(), etag, data)
+            self._reports.move_to_end(key)
+            while len(self._reports) > self.max_reports:
+                self._reports.popitem(last=False)
+        return data
+
+    def prefetch(self, companies):
+        """
+        Fetch reports for the given companies in the background (errors are ignored).
+        """
+        for company in companies:
+            key = company_key(company)
+            with self._lock:
+                cached = self._reports.get(key)
+                if key in self._inflight or (cached is not None and time.monotonic() - cached[0] < PREFETCH_TTL):
+                    continue
+                future = self._prefetcher.submit(self._fetch_report, company, key, cached)
+                self._inflight[key] = future
+            future.add_done_callback(lambda _, key=key: self._prefetch_done(key))
+
+    def _prefetch_done(self, key):
+        with self._lock:
+            self._inflight.pop(key, None)
+
+    def tts_job(self, company, timeout=60):
+        """
+        Start (or find) the Hindi audio job for a company's final summary and wait until it is
+        ready. Returns the job id, or None if generation failed or took longer than timeout.
+        """
+        with self._get(f"/tts/{quote(company, safe='')}", stream=True) as resp:
+            if resp.status_code == 200:
+                return resp.headers.get("X-TTS-Job")
+            if resp.status_code != 202:
+                return None
+            job = resp.json()["job"]
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            status = self._get(f"/tts/jobs/{job}").json().get("status")
+            if status == "ready":
+                return job
+            if status != "pending":
+                return None
+            time.sleep(0.5)
+        return None
+
+    def tts_audio(self, job):
+        """
+        MP3 bytes of a finished audio job.
+        """
+        resp = self._get(f"/tts/audio/{job}")
+        resp.raise_for_status()
+        return resp.content
+
+    def tts_audio_url(self, job, public_url=None):
+        """
+        URL a browser can play the audio from (public_url when the API is reachable under another name).
+        """
+        return f"{(public_url or self.base_url).rstrip('/')}/tts/audio/{job}"
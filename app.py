@@ -1,30 +1,85 @@
 import streamlit as st
 import requests
-import pickle
-import re
 import os
 
+from utils.api_client import API_URL, ApiClient
+from utils import company_list
+from utils.report_store import ReportStore
+
+# Browser-reachable API address for audio playback; when unset, audio bytes are sent through Streamlit
+PUBLIC_API_URL = os.environ.get("NEWS_PUBLIC_API_URL")
+DB_PATH = os.path.join('data', 'reports.db')
+
+
+@st.cache_resource
+def get_client():
+    # One pooled client per server process, shared by every session and rerun
+    return ApiClient(API_URL)
+
+
+@st.cache_resource
+def get_tts_jobs():
+    from utils.text_to_speech import TTSJobManager
+    return TTSJobManager()
+
+
+@st.cache_resource
+def get_local_store():
+    return ReportStore(DB_PATH)
+
+
+@st.cache_data(ttl=600, show_spinner=False)
+def load_companies():
+    try:
+        return get_client().companies()
+    except requests.RequestException:
+        # If API is not available, fall back to local CSV
+        return company_list.load_companies()
+
+
+@st.cache_data(ttl=60, show_spinner=False)
+def load_report(company):
+    try:
+        return get_client().report(company)
+    except requests.RequestException:
+        # Fallback: if API call failed, try reading the local report store
+        if os.path.exists(DB_PATH):
+            return get_local_store().latest_report(company)
+        return None
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def load_audio(company, final_text):
+    """
+    Hindi audio for a summary: a URL when the API is publicly reachable, otherwise MP3 bytes.
+    Keyed by the summary text, so a new report gets new audio. Failures raise, so they are not cached.
+    """
+    try:
+        job = get_client().tts_job(company)
+        if job:
+            if PUBLIC_API_URL:
+                return get_client().tts_audio_url(job, PUBLIC_API_URL)
+            return get_client().tts_audio(job)
+    except requests.RequestException:
+        pass
+    # API unavailable: generate locally (cached by text and shared with the API and cron pre-generation)
+    audio_file_path = get_tts_jobs().generate(final_text)
+    if audio_file_path and os.path.exists(audio_file_path):
+        with open(audio_file_path, 'rb') as audio_file:
+            return audio_file.read()
+    raise RuntimeError("Audio generation failed.")
+
+
 st.title("News Sentiment Analysis App")
 st.write("Select a company to view its news sentiment analysis and summaries.")
 
-# Define API base URL (for FastAPI)
-API_URL = "https://news.google.com/?hl=en-IN&gl=IN&ceid=IN%3Aen"
 # Load list of companies for dropdown
-companies = []
 placeholder = "-- Select Company --"
 try:
-    resp = requests.get(f"{API_URL}/companies")
-    if resp.status_code == 200:
-        companies = resp.json().get("companies", [])
+    companies = load_companies()
 except Exception as e:
-    # If API is not available, fall back to local CSV
-    try:
-        import pandas as pd
-        df = pd.read_csv("data/company_list.csv")
-        companies = df['Company'].dropna().tolist()
-    except Exception as e:
-        st.error("Failed to load company list.")
-        companies = []
+    st.error("Failed to load company list.")
+    companies = []
 if companies:
     companies = [placeholder] + companies
 
@@ -32,20 +87,10 @@ selected_company = st.selectbox("Company:", companies, index=0)
 
 if selected_company and selected_company != placeholder:
     # Fetch sentiment report data for the selected company
-    data = None
-    try:
-        resp = requests.get(f"{API_URL}/report/{selected_company}")
-        if resp.status_code == 200:
-            data = resp.json()
-    except Exception as e:
-        data = None
-    # Fallback: if API call failed, try loading local pickle file
-    if data is None:
-        filename_base = re.sub(r'\W+', '_', selected_company.lower())
-        file_path = os.path.join('data', 'output', f"{filename_base}.pkl")
-        if os.path.exists(file_path):
-            with open(file_path, 'rb') as f:
-                data = pickle.load(f)
+    data = load_report(selected_company)
+    # Warm the neighbours in the background so stepping through the list is instant
+    position = companies.index(selected_company)
+    get_client().prefetch(c for c in companies[max(1, position - 1):position + 2] if c != selected_company)
     if data is None:
         st.error("No data available for the selected company.")
     else:
@@ -104,15 +149,9 @@ if selected_company and selected_company != placeholder:
         if final_sent:
             st.markdown("### Hindi Audio of Overall Sentiment")
             if st.button("Play Audio"):
-                from utils.text_to_speech import text_to_speech_hindi
-                filename_base = re.sub(r'\W+', '_', selected_company.lower())
-                audio_file_path = os.path.join('data', 'output', f"{filename_base}_overall_sentiment_hi.mp3")
-                # Generate audio if not already generated
-                if not os.path.exists(audio_file_path):
-                    text_to_speech_hindi(final_sent, audio_file_path)
-                if os.path.exists(audio_file_path):
-                    audio_file = open(audio_file_path, 'rb')
-                    audio_bytes = audio_file.read()
-                    st.audio(audio_bytes, format='audio/mp3')
-                else:
+                try:
+                    with st.spinner("Generating audio..."):
+                        audio = load_audio(selected_company, final_sent)
+                    st.audio(audio, format='audio/mp3')
+                except Exception as e:
                     st.error("Audio generation failed.")
@@ -0,0 +1,96 @@
+import hashlib
+import json
+import os
+import tempfile
+
+ARTICLE_CACHE_DIR = os.path.join('data', 'cache', 'articles')
+ANALYSIS_CACHE_DIR = os.path.join('data', 'cache', 'analysis')
+
+
+def content_hash(text):
+    """
+    Return a stable hex digest for a piece of text (or bytes).
+    """
+    if isinstance(text, str):
+        text = text.encode('utf-8')
+    return hashlib.sha256(text).hexdigest()
+
+
+class DiskCache:
+    """
+    Minimal on-disk key/value store: one JSON file per key, sharded by the key's hash.
+    Writes go through a temp file and a rename, so concurrent writers (threads or cron
+    processes) never leave a half-written entry behind.
+    """
+    def __init__(self, directory):
+        self.directory = directory
+
+    def _path(self, key):
+        digest = content_hash(key)
+        return os.path.join(self.directory, digest[:2], f"{digest}.json")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def put(self, key, value):
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                json.dump(value, f, ensure_ascii=False)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+
+class ArticleCache(DiskCache):
+    """
+    Scraped articles keyed by URL: extracted content, content hash and the HTTP validators
+    (ETag / Last-Modified) needed to revalidate the page with a conditional request.
+    """
+    def __init__(self, directory=ARTICLE_CACHE_DIR):
+        super().__init__(directory)
+
+    def conditional_headers(self, entry):
+        """
+        Build If-None-Match / If-Modified-Since headers from a cached entry.
+        """
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def store(self, url, content, body_hash=None, etag=None, last_modified=None):
+        entry = {
+            "url": url,
+            "content": content,
+            "content_hash": content_hash(content),
+            "body_hash": body_hash,
+            "etag": etag,
+            "last_modified": last_modified,
+        }
+        self.put(url, entry)
+        return entry
+
+
+class AnalysisCache(DiskCache):
+    """
+    Per-article analysis results keyed by company, title and content hash, so unchanged
+    articles are not re-analyzed on the next run.
+    """
+    def __init__(self, directory=ANALYSIS_CACHE_DIR):
+        super().__init__(directory)
+
+    @staticmethod
+    def key(version, company_name, title, article_hash):
+        return "\0".join([str(version), company_name, title, article_hash])
@@ -0,0 +1,83 @@
+"""
+Benchmark the keyword scan in GeminiService against the original per-keyword implementation.
+
+Usage: python benchmarks/bench_analyze.py [--words 20000] [--articles 10] [--repeat 20]
+Checks that both implementations produce identical results before timing them.
+"""
+import argparse
+import random
+import re
+import time
+
+from utils.gemini_service import GeminiService, POSITIVE_KEYWORDS, NEGATIVE_KEYWORDS
+
+
+def legacy_scan(company_name, content):
+    """
+    The scan analyze_articles used before KeywordMatcher: one str.count/`in` per keyword
+    and a full proper-noun findall.
+    """
+    text_lower = content.lower()
+    pos_count = sum(text_lower.count(word) for word in POSITIVE_KEYWORDS)
+    neg_count = sum(text_lower.count(word) for word in NEGATIVE_KEYWORDS)
+    topics_set = set()
+    if "electric" in text_lower and "vehicle" in text_lower:
+        topics_set.add("Electric Vehicles")
+    if "stock" in text_lower or "market" in text_lower:
+        topics_set.add("Stock Market")
+    if "innovation" in text_lower or "innovative" in text_lower:
+        topics_set.add("Innovation")
+    if "regulation" in text_lower or "regulator" in text_lower:
+        topics_set.add("Regulations")
+    if "autonomous" in text_lower or "self-driving" in text_lower:
+        topics_set.add("Autonomous Vehicles")
+    if "merger" in text_lower or "acquisition" in text_lower:
+        topics_set.add("Mergers & Acquisitions")
+    if "profit" in text_lower or "earnings" in text_lower or "quarter" in text_lower:
+        topics_set.add("Financial Performance")
+    for word in re.findall(r'\b[A-Z][a-zA-Z]+\b', content):
+        if word.lower() == company_name.lower():
+            continue
+        if len(topics_set) >= 5:
+            break
+        topics_set.add(word)
+    return pos_count, neg_count, topics_set
+
+
+def make_article(rng, words):
+    vocab = ["the", "company", "reported", "a", "strong", "quarter", "with", "revenue", "of", "analysts",
+             "said", "growth", "and", "risk", "were", "in", "focus", "while", "decline", "profit", "was",
+             "Tesla", "Google", "Reuters", "electric", "vehicle", "sales", "rose", "regulator", "down"]
+    vocab += ["".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9))) for _ in range(400)]
+    return " ".join(rng.choice(vocab) for _ in range(words)) + "."
+
+
+def timeit(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--words", type=int, default=20000, help="Words per article.")
+    parser.add_argument("--articles", type=int, default=10, help="Articles per company.")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    contents = [make_article(rng, args.words) for _ in range(args.articles)]
+    service = GeminiService()
+    for content in contents:
+        assert service.matcher.match("Tesla", content) == legacy_scan("Tesla", content), "results differ"
+
+    legacy = timeit(lambda: [legacy_scan("Tesla", c) for c in contents], args.repeat)
+    current = timeit(lambda: [service.matcher.match("Tesla", c) for c in contents], args.repeat)
+    print(f"{args.articles} articles x {args.words} words")
+    print(f"  legacy scan : {legacy * 1000:8.2f} ms/company")
+    print(f"  matcher scan: {current * 1000:8.2f} ms/company  ({legacy / current:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Load benchmark for GET /report/{company}: the original pickle handler (os.path.exists + unpickle +
+jsonable_encoder on every request) against the cached, store-backed handler in api.py.
+
+Usage: python benchmarks/bench_api.py [--requests 2000] [--concurrency 16] [--articles 10]
+Runs against a temporary data directory with synthetic reports; prints p50/p99 latency and req/s.
+"""
+import argparse
+import os
+import pickle
+import random
+import re
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import uvicorn
+from fastapi import HTTPException
+
+
+def make_report(company, articles):
+    rng = random.Random(company)
+    words = ["growth", "market", "profit", "decline", "regulator", "Tesla", "quarter", "the", "and", "said"]
+    return {
+        "Company": company,
+        "Articles": [{
+            "Title": f"{company} headline {i}",
+            "Summary": " ".join(rng.choice(words) for _ in range(60)),
+            "Sentiment": rng.choice(["Positive", "Negative", "Neutral"]),
+            "Topics": rng.sample(words, 5),
+        } for i in range(articles)],
+        "Comparative Sentiment Score": {
+            "Sentiment Distribution": {"Positive": 4, "Negative": 3, "Neutral": 3},
+            "Coverage Differences": [{"Comparison": "x" * 80, "Impact": "y" * 80}],
+            "Topic Overlap": {"Common Topics": words[:3]},
+        },
+        "Final Sentiment Analysis": f"{company}'s latest news coverage is mixed.",
+    }
+
+
+def legacy_get_report(company_name: str):
+    """The /report handler as it was before the report cache."""
+    filename = re.sub(r'\W+', '_', company_name.lower())
+    file_path = os.path.join('data', 'output', f"{filename}.pkl")
+    if not os.path.exists(file_path):
+        raise HTTPException(status_code=404, detail="Report not found for the specified company.")
+    with open(file_path, 'rb') as f:
+        return pickle.load(f)
+
+
+def start_server(app, port):
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+
+def run_load(base_url, path_template, companies, total, concurrency, headers_fn=None):
+    session = requests.Session()
+    session.mount("http://", requests.adapters.HTTPAdapter(pool_maxsize=concurrency))
+    latencies = []
+    lock = threading.Lock()
+
+    def one(i):
+        company = companies[i % len(companies)]
+        headers = headers_fn(company) if headers_fn else None
+        start = time.perf_counter()
+        resp = session.get(base_url + path_template.format(company), headers=headers)
+        elapsed = time.perf_counter() - start
+        assert resp.status_code in (200, 304), resp.status_code
+        with lock:
+            latencies.append(elapsed)
+        return resp
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(total)))
+    wall = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+        "rps": total / wall,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--companies", type=int, default=50)
+    parser.add_argument("--articles", type=int, default=10)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_api_")
+    os.makedirs(os.path.join(workdir, "data", "output"))
+    os.chdir(workdir)
+    # Seed the same reports as legacy pickles and as rows in the report store
+    from utils.report_store import ReportStore
+    store = ReportStore()
+    companies = [f"Company {i}" for i in range(args.companies)]
+    for company in companies:
+        report = make_report(company, args.articles)
+        filename = re.sub(r'\W+', '_', company.lower())
+        with open(os.path.join("data", "output", f"{filename}.pkl"), "wb") as f:
+            pickle.dump(report, f)
+        store.save_report(company, report)
+
+    from utils.api import app
+    app.add_api_route("/legacy/report/{company_name}", legacy_get_report, methods=["GET"])
+    server, thread = start_server(app, args.port)
+    base_url = f"http://127.0.0.1:{args.port}"
+    try:
+        # Warm up both routes (and the cache) before measuring
+        run_load(base_url, "/legacy/report/{}", companies, len(companies), 4)
+        run_load(base_url, "/report/{}", companies, len(companies), 4)
+        etags = {c: requests.get(f"{base_url}/report/{c}").headers["ETag"] for c in companies}
+        results = {
+            "legacy": run_load(base_url, "/legacy/report/{}", companies, args.requests, args.concurrency),
+            "cached": run_load(base_url, "/report/{}", companies, args.requests, args.concurrency),
+            "cached_304": run_load(base_url, "/report/{}", companies, args.requests, args.concurrency,
+                                   headers_fn=lambda c: {"If-None-Match": etags[c]}),
+        }
+    finally:
+        server.should_exit = True
+        thread.join()
+    print(f"{args.requests} requests, concurrency {args.concurrency}, {args.articles} articles/report")
+    for name, r in results.items():
+        print(f"  {name:<11} p50 {r['p50_ms']:7.2f} ms   p99 {r['p99_ms']:7.2f} ms   {r['rps']:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    main()
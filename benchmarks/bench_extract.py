@@ -0,0 +1,118 @@
+"""
+Benchmark article text extraction backends (lxml, strainer, html.parser) on recorded pages.
+
+Usage: python benchmarks/bench_extract.py [--pages DIR] [--repeat 5] [--max-chars N]
+Pages are *.html files in DIR (default: benchmarks/fixtures/pages, or synthetic heavy pages if
+that does not exist). Reports time per page and peak memory per page for each backend, measured
+in a fresh subprocess per (backend, page): the tracemalloc peak (Python heap, which holds the whole
+BeautifulSoup tree) and the growth of max RSS (which also covers libxml2's own allocations, but
+stays at 0 while the page is small enough to fit under the interpreter's startup high-water mark).
+"""
+import argparse
+import glob
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+from utils.html_extract import BACKENDS, extract_content
+
+DEFAULT_PAGES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "pages")
+
+
+def synthetic_page(rng, paragraphs, with_article):
+    """
+    A heavy news-like page: big nav/footer, inline scripts and styles, many paragraphs.
+    """
+    words = ["market", "growth", "shares", "Tesla", "quarter", "regulator", "the", "and", "said", "profit"]
+    nav = "".join(f'<li><a href="/s/{i}">Section {i}</a></li>' for i in range(400))
+    scripts = "".join(f"<script>var x{i} = {json.dumps(['a' * 50] * 20)};</script>" for i in range(40))
+    body = "".join("<p>" + " ".join(rng.choice(words) for _ in range(80)) + ".</p>" for _ in range(paragraphs))
+    if with_article:
+        body = f"<article><h1>Headline</h1>{body}</article>"
+    return (f"<!DOCTYPE html><html><head><meta charset='utf-8'><style>{'.c{color:red}' * 500}</style>"
+            f"{scripts}</head><body><nav><ul>{nav}</ul></nav>{body}<footer>{nav}</footer></body></html>")
+
+
+def load_pages(directory):
+    if directory and os.path.isdir(directory):
+        paths = sorted(glob.glob(os.path.join(directory, "*.html")))
+        if paths:
+            return paths
+    # No recorded pages: write synthetic ones to a temp dir
+    rng = random.Random(7)
+    tmp = tempfile.mkdtemp(prefix="bench_extract_")
+    paths = []
+    for name, paragraphs, with_article in [("heavy_article", 300, True), ("heavy_paragraphs", 300, False),
+                                           ("light_article", 20, True)]:
+        path = os.path.join(tmp, f"{name}.html")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(synthetic_page(rng, paragraphs, with_article))
+        paths.append(path)
+    return paths
+
+
+def child_peak_kb(backend, path, max_chars):
+    """
+    Run one extraction in a fresh interpreter. Returns (tracemalloc_peak_kib, max_rss_growth_kib).
+    """
+    code = (
+        "import resource, tracemalloc\n"
+        "from utils.html_extract import extract_content\n"
+        f"data = open({path!r}, 'rb').read()\n"
+        "chunks = [data[i:i + 65536] for i in range(0, len(data), 65536)]\n"
+        "before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+        "tracemalloc.start()\n"
+        f"extract_content(chunks, backend={backend!r}, max_chars={max_chars!r})\n"
+        "peak = tracemalloc.get_traced_memory()[1]\n"
+        "print(peak // 1024, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss - before)\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True,
+                         env=dict(os.environ, PYTHONPATH=os.pathsep.join(sys.path)))
+    heap_kb, rss_kb = out.stdout.split()
+    return int(heap_kb), int(rss_kb)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--pages", default=DEFAULT_PAGES)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--max-chars", type=int, default=None, help="Early-termination text cap.")
+    parser.add_argument("--json", action="store_true", help="Print machine-readable results.")
+    args = parser.parse_args()
+
+    results = []
+    for path in load_pages(args.pages):
+        with open(path, "rb") as f:
+            data = f.read()
+        chunks = [data[i:i + 65536] for i in range(0, len(data), 65536)]
+        reference = extract_content(chunks, backend="html.parser", max_chars=args.max_chars)
+        for backend in BACKENDS:
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                content = extract_content(chunks, backend=backend, max_chars=args.max_chars)
+            elapsed = (time.perf_counter() - start) / args.repeat
+            peak_heap_kb, peak_rss_kb = child_peak_kb(backend, path, args.max_chars)
+            results.append({
+                "page": os.path.basename(path),
+                "bytes": len(data),
+                "backend": backend,
+                "ms_per_page": round(elapsed * 1000, 3),
+                "peak_heap_kb": peak_heap_kb,
+                "peak_rss_kb": peak_rss_kb,
+                "chars": len(content),
+                "same_as_html_parser": " ".join(content.split()) == " ".join(reference.split()),
+            })
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        print(f"{r['page']:<24} {r['bytes'] / 1024:8.0f} KiB  {r['backend']:<12} {r['ms_per_page']:9.2f} ms"
+              f"  heap {r['peak_heap_kb']:7d} KiB  rss +{r['peak_rss_kb']:6d} KiB  {r['chars']:7d} chars  same={r['same_as_html_parser']}")
+
+
+if __name__ == "__main__":
+    main()
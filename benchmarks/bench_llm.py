@@ -0,0 +1,76 @@
+"""
+Benchmark the batched Gemini backend against the mock endpoint of the local stand-in server.
+
+Usage: python benchmarks/bench_llm.py [--companies 20] [--articles 10] [--llm-latency-ms 300]
+                                      [--llm-error-rate 0.1] [--rpm 600]
+Analyzes the same synthetic articles one article per request (the naive approach) and with
+token-budget batching, and reports wall time, requests made, retries and heuristic fallbacks.
+No network access or API key is needed.
+"""
+import argparse
+import random
+import time
+
+from bench_analyze import make_article
+from news_server import NewsStandIn, start_server
+from utils.gemini_service import GeminiService
+from utils.llm_backend import GeminiLLM
+from utils.metrics import metrics
+
+
+def run(base_url, standin, companies_articles, **llm_args):
+    metrics.reset()
+    before = standin.requests["llm"]
+    service = GeminiService(llm=GeminiLLM("mock-key", base_url=base_url, **llm_args))
+    start = time.perf_counter()
+    results = service.analyze_batch(companies_articles)
+    wall = time.perf_counter() - start
+    counters = metrics.snapshot()["counters"]
+    by_result = {entry["labels"]["result"]: entry["value"] for entry in counters.get("llm_articles", [])}
+    retries = sum(entry["value"] for entry in counters.get("llm_retries", []))
+    return {
+        "wall_seconds": round(wall, 3),
+        "requests": standin.requests["llm"] - before,
+        "retries": retries,
+        "articles": by_result,
+        "companies": len(results),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--companies", type=int, default=20)
+    parser.add_argument("--articles", type=int, default=10, help="Articles per company.")
+    parser.add_argument("--words", type=int, default=400, help="Words per article.")
+    parser.add_argument("--llm-latency-ms", type=float, default=300.0)
+    parser.add_argument("--llm-error-rate", type=float, default=0.1)
+    parser.add_argument("--rpm", type=float, default=600.0, help="Requests-per-minute limit.")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--deadline", type=float, default=60.0)
+    args = parser.parse_args()
+
+    rng = random.Random(3)
+    companies_articles = {
+        f"Company {i}": [{"title": f"Headline {i}-{j}", "content": make_article(rng, args.words)}
+                         for j in range(args.articles)]
+        for i in range(args.companies)
+    }
+    standin = NewsStandIn(llm_latency_ms=args.llm_latency_ms, llm_error_rate=args.llm_error_rate)
+    server, base_url = start_server(standin)
+    common = {"requests_per_minute": args.rpm, "concurrency": args.concurrency, "deadline": args.deadline}
+    try:
+        print(f"{args.companies} companies x {args.articles} articles, mock latency {args.llm_latency_ms:.0f} ms, "
+              f"error rate {args.llm_error_rate:.0%}, {args.rpm:.0f} rpm")
+        for label, extra in [("one article per request", {"max_batch_articles": 1}),
+                             ("batched (8k-token budget)", {"max_batch_tokens": 8000, "max_batch_articles": 25}),
+                             ("batched, 1 s deadline", {"max_batch_tokens": 8000, "max_batch_articles": 25,
+                                                        "deadline": 1})]:
+            result = run(f"{base_url}/v1beta", standin, companies_articles, **{**common, **extra})
+            print(f"  {label:<28} {result['wall_seconds']:7.2f} s  {result['requests']:4d} requests  "
+                  f"{result['retries']:3d} retries  articles: {result['articles']}")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,111 @@
+"""
+Simulate the refresh daemon's scheduler under a fixed crawl budget (no network, simulated clock).
+
+Usage: python benchmarks/bench_scheduler.py [--companies 500] [--polls-per-hour 300] [--hours 24]
+Companies get Zipf-distributed news rates (new stories per hour) and API popularity. Each poll
+uses one slot of the budget; the scheduler under test decides which company gets it. Reports
+how long new stories wait before they are picked up (overall and for the hottest 10% of
+companies) and the staleness seen by API requests, for the priority scheduler and for the
+equal-priority baseline (the same scheduler with both weights set to 0, i.e. round robin).
+"""
+import argparse
+import random
+
+from utils.scheduler import RefreshScheduler
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(fraction * len(values)))]
+
+
+def simulate(companies, rates, popularity, scheduler, polls_per_hour, hours, seed):
+    """
+    Run one simulated day. Returns delay and staleness figures in minutes.
+    """
+    rng = random.Random(seed)
+    scheduler.set_companies(companies)
+    scheduler.set_popularity(popularity)
+    hot = set(sorted(companies, key=rates.get, reverse=True)[:max(1, len(companies) // 10)])
+    # Story arrival times per company, drawn up front (Poisson processes)
+    arrivals = {}
+    for company in companies:
+        times, t = [], 0.0
+        while True:
+            t += rng.expovariate(rates[company] / 3600) if rates[company] > 0 else float("inf")
+            if t >= hours * 3600:
+                break
+            times.append(t)
+        arrivals[company] = times
+    seen = {company: 0 for company in companies}
+    last_poll = {company: 0.0 for company in companies}
+    delays, hot_delays, staleness = [], [], []
+    total_hits = sum(popularity.values())
+    slot = 3600 / polls_per_hour
+    now, next_sample = 0.0, 0.0
+    while now < hours * 3600:
+        while next_sample <= now:
+            # Staleness as seen by an API request: popularity-weighted time since the last poll
+            staleness.append(sum(popularity[c] * (next_sample - last_poll[c]) for c in companies) / total_hits)
+            next_sample += 60
+        company = scheduler.next_due(now)
+        if company is None:
+            now += max(slot, scheduler.seconds_until_due(now) or slot)
+            continue
+        times = arrivals[company]
+        first_new = seen[company]
+        while seen[company] < len(times) and times[seen[company]] <= now:
+            seen[company] += 1
+        new = times[first_new:seen[company]]
+        for arrived in new:
+            delays.append(now - arrived)
+            if company in hot:
+                hot_delays.append(now - arrived)
+        scheduler.record_poll(company, [], len(new) if last_poll[company] else None, now)
+        scheduler.finish(company, now, "saved" if new else "unchanged")
+        last_poll[company] = now
+        now += slot
+    return {
+        "stories": len(delays),
+        "story_delay_p50": percentile(delays, 0.5) / 60,
+        "story_delay_p90": percentile(delays, 0.9) / 60,
+        "hot_story_delay_p50": percentile(hot_delays, 0.5) / 60,
+        "hot_story_delay_p90": percentile(hot_delays, 0.9) / 60,
+        "request_staleness_mean": sum(staleness) / len(staleness) / 60,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--companies", type=int, default=500)
+    parser.add_argument("--polls-per-hour", type=float, default=300.0, help="Crawl budget in feed polls.")
+    parser.add_argument("--hours", type=float, default=24.0, help="Simulated time.")
+    parser.add_argument("--interval", type=float, default=3600.0, help="Refresh interval of a cold company (s).")
+    parser.add_argument("--min-interval", type=float, default=300.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    companies = [f"Company {i:04d}" for i in range(args.companies)]
+    # Zipf-like skew: a few companies get most stories and most API traffic (loosely correlated)
+    ranks = list(range(1, args.companies + 1))
+    rates = {c: 20.0 / rank for c, rank in zip(companies, ranks)}
+    rng.shuffle(ranks)
+    mixed = [r if rng.random() < 0.5 else i + 1 for i, r in enumerate(ranks)]
+    popularity = {c: int(5000 / rank) for c, rank in zip(companies, mixed)}
+
+    print(f"{args.companies} companies, budget {args.polls_per_hour:.0f} polls/hour, {args.hours:.0f} h simulated "
+          f"(delays and staleness in minutes)")
+    for label, weights in [("round robin", {"velocity_weight": 0, "popularity_weight": 0}),
+                           ("priority", {})]:
+        scheduler = RefreshScheduler(interval=args.interval, min_interval=args.min_interval, **weights)
+        result = simulate(companies, rates, popularity, scheduler, args.polls_per_hour, args.hours, args.seed)
+        print(f"  {label:<12} story delay p50 {result['story_delay_p50']:6.1f} p90 {result['story_delay_p90']:6.1f}  "
+              f"hot 10% p50 {result['hot_story_delay_p50']:6.1f} p90 {result['hot_story_delay_p90']:6.1f}  "
+              f"request staleness {result['request_staleness_mean']:6.1f}  ({result['stories']} stories)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Cold-start benchmark: import time of api.py and cron.py, and how soon a fresh API process answers.
+
+Usage: python benchmarks/bench_startup.py [--repeat 5] [--output startup.json] [--check]
+Each measurement runs in a new interpreter. Reports the median import time, which heavy
+libraries the import pulled in, the time from spawning uvicorn to its first answer, and the
+latency of the first and second /companies and /reports/summary requests. With --check, exits
+non-zero if importing api or cron loads any of the libraries that should only load on first use.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from run_suite import child_env, free_port
+
+# Libraries that api.py and cron.py must not import at startup (they load on first use)
+DEFERRED = ["pandas", "bs4", "requests", "gtts", "googletrans", "lxml"]
+
+IMPORT_PROBE = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+seconds = time.perf_counter() - start
+print(json.dumps({{"seconds": seconds, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def measure_import(workdir, module, repeat):
+    """
+    Import `module` in `repeat` fresh interpreters. Returns (median seconds, deferred modules loaded).
+    """
+    times, loaded = [], set()
+    for _ in range(repeat):
+        proc = subprocess.run([sys.executable, "-c", IMPORT_PROBE.format(module=module, deferred=DEFERRED)],
+                              cwd=workdir, capture_output=True, text=True, env=child_env())
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        times.append(result["seconds"])
+        loaded.update(result["loaded"])
+    return statistics.median(times), sorted(loaded)
+
+
+def timed_get(url):
+    start = time.perf_counter()
+    response = requests.get(url, timeout=30)
+    return response.status_code, time.perf_counter() - start
+
+
+def measure_first_requests(workdir):
+    """
+    Start a fresh API process and time it until it answers, then time the first requests it serves.
+    """
+    port = free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    cmd = [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning"]
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=workdir, env=child_env(), stdout=subprocess.DEVNULL)
+    try:
+        ready = None
+        while time.perf_counter() - start < 30 and proc.poll() is None:
+            try:
+                requests.get(base_url + "/", timeout=1)
+                ready = time.perf_counter() - start
+                break
+            except requests.RequestException:
+                time.sleep(0.01)
+        if ready is None:
+            raise RuntimeError("API server did not start")
+        result = {"ready_seconds": ready}
+        for name, path in [("companies", "/companies"), ("summary", "/reports/summary")]:
+            status, first = timed_get(base_url + path)
+            _, second = timed_get(base_url + path)
+            result[name] = {"status": status, "first_seconds": first, "second_seconds": second}
+        return result
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh processes per measurement.")
+    parser.add_argument("--companies", type=int, default=500, help="Rows in the synthetic company list.")
+    parser.add_argument("--output", help="Write results JSON here as well.")
+    parser.add_argument("--check", action="store_true",
+                        help="Fail if importing api or cron loads a library from the deferred list.")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="news_startup_")
+    os.makedirs(os.path.join(workdir, "data"))
+    with open(os.path.join(workdir, "data", "company_list.csv"), "w") as f:
+        f.write("Company\n" + "\n".join(f"Company {i:04d}" for i in range(args.companies)) + "\n")
+
+    results = {"python": sys.version.split()[0], "imports": {}, "api": []}
+    failed = False
+    for module in ("api", "cron"):
+        seconds, loaded = measure_import(workdir, module, args.repeat)
+        results["imports"][module] = {"median_seconds": seconds, "deferred_loaded": loaded}
+        print(f"import {module:<5} {seconds * 1000:7.1f} ms (median of {args.repeat})"
+              + (f"  loads deferred: {', '.join(loaded)}" if loaded else ""))
+        failed = failed or bool(loaded)
+    for _ in range(args.repeat):
+        results["api"].append(measure_first_requests(workdir))
+    ready = statistics.median(run["ready_seconds"] for run in results["api"])
+    print(f"API ready         {ready * 1000:7.1f} ms after spawn (median)")
+    for name in ("companies", "summary"):
+        first = statistics.median(run[name]["first_seconds"] for run in results["api"])
+        second = statistics.median(run[name]["second_seconds"] for run in results["api"])
+        print(f"first {name:<11} {first * 1000:7.1f} ms, second {second * 1000:.1f} ms (median)")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(json.dumps(results, indent=2) + "\n")
+        print(f"Wrote {args.output}")
+    if args.check and failed:
+        sys.exit("api/cron import pulled in libraries that should load on first use")
+
+
+if __name__ == "__main__":
+    main()
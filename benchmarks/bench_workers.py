@@ -0,0 +1,88 @@
+"""
+Scale-out benchmark for cron worker mode: 1, 2, 4, ... `cron.py --worker` processes sharing one
+work queue and report store, against the local stand-in news server.
+
+Usage: python benchmarks/bench_workers.py [--companies 60] [--workers 1,2,4] [--latency-ms 100]
+                                          [--kill-one]
+For each worker count, a fresh working directory is processed once and the wall time until the
+last worker exits is reported, with how many runs were stored per company (every company should
+be stored exactly once). With --kill-one, one worker is killed shortly after the start and the
+others must take over its leases (WORK_LEASE_SECONDS is lowered to 3 for this).
+"""
+import argparse
+import os
+import signal
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+
+from news_server import add_arguments, standin_from_args, start_server
+from run_suite import ROOT, child_env
+from utils.report_store import company_key
+
+
+def run_round(args, workers, news_url):
+    workdir = tempfile.mkdtemp(prefix="news_workers_")
+    os.makedirs(os.path.join(workdir, "data"))
+    companies = [f"Company {i:04d}" for i in range(args.companies)]
+    with open(os.path.join(workdir, "data", "company_list.csv"), "w") as f:
+        f.write("Company\n" + "\n".join(companies) + "\n")
+    env = child_env({"NEWS_RSS_URL": f"{news_url}/rss/search?q={{query}}",
+                     "WORK_LEASE_SECONDS": "3" if args.kill_one else os.environ.get("WORK_LEASE_SECONDS", "300")})
+    cmd = [sys.executable, os.path.join(ROOT, "cron.py"), "--worker", "--round", "1",
+           "--scrape-workers", str(args.scrape_workers), "--analyze-workers", "1",
+           "--num-articles", str(args.num_articles), "--no-cache"]
+    start = time.perf_counter()
+    procs = [subprocess.Popen(cmd, cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+             for _ in range(workers)]
+    killed = False
+    if args.kill_one and workers > 1:
+        time.sleep(1.0)
+        procs[0].send_signal(signal.SIGKILL)
+        killed = True
+    for proc in procs:
+        proc.wait()
+    wall = time.perf_counter() - start
+    with sqlite3.connect(os.path.join(workdir, "data", "reports.db")) as conn:
+        runs = dict(conn.execute("SELECT company_key, COUNT(*) FROM runs GROUP BY company_key").fetchall())
+    per_company = [runs.get(company_key(company), 0) for company in companies]
+    return {
+        "workers": workers,
+        "killed": killed,
+        "wall_seconds": wall,
+        "companies_per_second": args.companies / wall,
+        "missing": sum(1 for n in per_company if n == 0),
+        "duplicates": sum(n - 1 for n in per_company if n > 1),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--companies", type=int, default=60)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts to compare.")
+    parser.add_argument("--scrape-workers", type=int, default=2, help="Scraper threads per worker.")
+    parser.add_argument("--num-articles", type=int, default=6)
+    parser.add_argument("--kill-one", action="store_true", help="Kill one worker after a second.")
+    add_arguments(parser)
+    parser.set_defaults(latency_ms=100.0)
+    args = parser.parse_args()
+
+    server, news_url = start_server(standin_from_args(args))
+    try:
+        single = None
+        for workers in [int(n) for n in args.workers.split(",")]:
+            result = run_round(args, workers, news_url)
+            if workers == 1:
+                single = result["companies_per_second"]
+            speedup = f" ({result['companies_per_second'] / single:4.1f}x one worker)" if single else ""
+            print(f"{workers} worker(s){' (one killed)' if result['killed'] else ''}: "
+                  f"{result['wall_seconds']:6.1f} s, {result['companies_per_second']:5.2f} companies/s{speedup}, "
+                  f"{result['missing']} missing, {result['duplicates']} duplicate runs")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Local stand-in for Google News and article sites, for offline benchmarks.
+
+Serves an RSS feed shaped like Google News at /rss/search?q=<company> whose items link back to
+/article/<company>/<n>, and serves article pages replayed from benchmarks/fixtures/pages with
+the company name filled in. The fixture pages are synthetic stand-ins modelled on typical news
+pages (navigation, inline scripts, <article> or bare <p> layouts), not copies of real articles.
+
+Latency and failures can be injected: every article response is delayed by latency_ms plus up
+to jitter_ms, error_rate of them answer 500, and hang_rate of them stall for hang_seconds (longer
+than the scraper's timeout). Feeds and articles send an ETag and honour If-None-Match.
+
+It also mocks the Gemini generateContent endpoint at /v1beta/models/<model>:generateContent for
+the LLM backend (GEMINI_API_URL=http://127.0.0.1:8700/v1beta): answers are derived from keyword
+counts in each article, after llm_latency_ms, and llm_error_rate of the calls answer 429.
+
+Usage: python benchmarks/news_server.py [--port 8700] [--latency-ms 50] [--error-rate 0.05]
+Then point the scraper at it with NEWS_RSS_URL=http://127.0.0.1:8700/rss/search?q={query}
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs, quote, unquote
+from xml.sax.saxutils import escape
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+SOURCES = ["Example Wire", "Market Daily", "Business Times", "Tech Ledger", "The Observer"]
+HEADLINES = [
+    "{company} shares climb after record quarter",
+    "{company} faces regulator scrutiny over data issue",
+    "What {company}'s new strategy means for investors",
+    "{company} announces merger talks with rival",
+    "Analysts split on {company} outlook",
+    "{company} to expand electric vehicle investment",
+]
+
+
+class NewsStandIn:
+    """
+    Configuration and fixtures for the stand-in server (shared by all handler threads).
+    """
+    def __init__(self, items_per_feed=20, latency_ms=0, jitter_ms=0, error_rate=0.0,
+                 hang_rate=0.0, hang_seconds=15, seed=0, llm_latency_ms=0, llm_error_rate=0.0):
+        self.items_per_feed = items_per_feed
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.hang_rate = hang_rate
+        self.hang_seconds = hang_seconds
+        self.llm_latency_ms = llm_latency_ms
+        self.llm_error_rate = llm_error_rate
+        self.rng = random.Random(seed)
+        self.rng_lock = threading.Lock()
+        with open(os.path.join(FIXTURES, "rss.xml"), encoding="utf-8") as f:
+            self.rss_template = f.read()
+        self.pages = []
+        for path in sorted(glob.glob(os.path.join(FIXTURES, "pages", "*.html"))):
+            with open(path, encoding="utf-8") as f:
+                self.pages.append(f.read())
+        self.requests = {"rss": 0, "rss_not_modified": 0, "article": 0, "not_modified": 0, "errors": 0, "hangs": 0,
+                         "llm": 0, "llm_articles": 0, "llm_throttled": 0}
+
+    def count(self, name):
+        with self.rng_lock:
+            self.requests[name] += 1
+
+    def random(self):
+        with self.rng_lock:
+            return self.rng.random()
+
+    def feed(self, base_url, company):
+        items = []
+        for n in range(self.items_per_feed):
+            source = SOURCES[n % len(SOURCES)]
+            title = HEADLINES[n % len(HEADLINES)].format(company=company)
+            link = f"{base_url}/article/{quote(company)}/{n}"
+            items.append(
+                f"<item><title>{escape(title)} - {escape(source)}</title><link>{escape(link)}</link>"
+                f"<guid isPermaLink=\"false\">{escape(link)}</guid>"
+                f"<pubDate>Mon, 24 Mar 2025 0{n % 10}:00:00 GMT</pubDate>"
+                f"<source url=\"https://example.com\">{escape(source)}</source></item>")
+        return (self.rss_template.replace("{{QUERY}}", escape(company))
+                .replace("{{ITEMS}}", "\n".join(items)))
+
+    def article(self, company, n):
+        page = self.pages[n % len(self.pages)]
+        title = HEADLINES[n % len(HEADLINES)].format(company=company)
+        return page.replace("{{COMPANY}}", escape(company)).replace("{{TITLE}}", escape(title))
+
+    def llm_answer(self, prompt):
+        """
+        Mock Gemini answer for a GeminiLLM prompt: the JSON article list follows "ARTICLES:".
+        """
+        articles = json.loads(prompt.split("ARTICLES:", 1)[1])
+        answers = []
+        for art in articles:
+            text = art["text"].lower()
+            score = sum(text.count(w) for w in ("growth", "record", "profit", "climb")) - \
+                sum(text.count(w) for w in ("scrutiny", "loss", "decline", "risk"))
+            sentiment = "Positive" if score > 0 else "Negative" if score < 0 else "Neutral"
+            summary = art["text"].split(". ")[0][:200]
+            answers.append({"id": art["id"], "summary": summary, "sentiment": sentiment,
+                            "topics": [art["company"], "Markets"]})
+        return answers
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body=b"", content_type="text/html; charset=utf-8", headers=None):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def do_POST(self):
+        standin = self.server.standin
+        path = urlparse(self.path).path
+        if not (path.startswith("/v1beta/models/") and path.endswith(":generateContent")):
+            return self._send(404, b"not found")
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        if not self.headers.get("x-goog-api-key"):
+            return self._send(403, b'{"error": "missing API key"}', "application/json")
+        standin.count("llm")
+        if standin.llm_latency_ms:
+            time.sleep(standin.llm_latency_ms / 1000)
+        if standin.random() < standin.llm_error_rate:
+            standin.count("llm_throttled")
+            return self._send(429, b'{"error": "rate limited"}', "application/json", headers={"Retry-After": "0.2"})
+        prompt = body["contents"][0]["parts"][0]["text"]
+        answers = standin.llm_answer(prompt)
+        for _ in answers:
+            standin.count("llm_articles")
+        text = json.dumps(answers)
+        prompt_tokens = len(prompt) // 4
+        output_tokens = len(text) // 4
+        response = {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": text}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": output_tokens,
+                              "totalTokenCount": prompt_tokens + output_tokens},
+        }
+        self._send(200, json.dumps(response).encode("utf-8"), "application/json")
+
+    def do_GET(self):
+        standin = self.server.standin
+        url = urlparse(self.path)
+        if url.path == "/rss/search":
+            standin.count("rss")
+            company = parse_qs(url.query).get("q", [""])[0]
+            base_url = f"http://{self.headers.get('Host')}"
+            body = standin.feed(base_url, company).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                standin.count("rss_not_modified")
+                return self._send(304, headers={"ETag": etag})
+            return self._send(200, body, "application/xml; charset=utf-8", headers={"ETag": etag})
+        parts = url.path.strip("/").split("/")
+        if len(parts) == 3 and parts[0] == "article" and parts[2].isdigit():
+            standin.count("article")
+            delay = standin.latency_ms + standin.random() * standin.jitter_ms
+            if delay:
+                time.sleep(delay / 1000)
+            roll = standin.random()
+            if roll < standin.hang_rate:
+                standin.count("hangs")
+                time.sleep(standin.hang_seconds)
+            elif roll < standin.hang_rate + standin.error_rate:
+                standin.count("errors")
+                return self._send(500, b"injected error")
+            body = standin.article(unquote(parts[1]), int(parts[2])).encode("utf-8")
+            etag = '"' + hashlib.sha1(body).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                standin.count("not_modified")
+                return self._send(304, headers={"ETag": etag})
+            return self._send(200, body, headers={"ETag": etag})
+        self._send(404, b"not found")
+
+
+def start_server(standin, host="127.0.0.1", port=0):
+    """
+    Start the stand-in on a background thread. Returns (server, base_url).
+    """
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    server.standin = standin
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://{host}:{server.server_address[1]}"
+
+
+def add_arguments(parser):
+    parser.add_argument("--items", type=int, default=20, help="RSS items per feed.")
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="Base delay per article response.")
+    parser.add_argument("--jitter-ms", type=float, default=0.0, help="Extra random delay per article response.")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Fraction of articles answering 500.")
+    parser.add_argument("--hang-rate", type=float, default=0.0, help="Fraction of articles that stall.")
+    parser.add_argument("--hang-seconds", type=float, default=15.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0, help="Delay per mock Gemini call.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of mock Gemini calls answering 429.")
+
+
+def standin_from_args(args):
+    return NewsStandIn(items_per_feed=args.items, latency_ms=args.latency_ms, jitter_ms=args.jitter_ms,
+                       error_rate=args.error_rate, hang_rate=args.hang_rate,
+                       hang_seconds=args.hang_seconds, seed=args.seed,
+                       llm_latency_ms=args.llm_latency_ms, llm_error_rate=args.llm_error_rate)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--port", type=int, default=8700)
+    add_arguments(parser)
+    args = parser.parse_args()
+    server, base_url = start_server(standin_from_args(args), port=args.port)
+    print(f"Serving stand-in news on {base_url}")
+    print(f"  NEWS_RSS_URL={base_url}/rss/search?q={{query}}")
+    print(f"  GEMINI_API_URL={base_url}/v1beta")
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
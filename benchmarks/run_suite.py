@@ -0,0 +1,152 @@
+"""
+Offline end-to-end benchmark suite: cron over N synthetic companies against the local stand-in
+news server, then a load test of the FastAPI /report, /reports/summary and /companies endpoints
+on the result.
+
+Usage: python benchmarks/run_suite.py [--companies 50] [--latency-ms 50] [--error-rate 0.05]
+                                      [--output results.json]
+Everything runs in a temporary working directory and needs no network access. Results are
+written as JSON (stdout, or --output) so runs can be compared across commits.
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+
+import requests
+
+from bench_api import run_load
+from news_server import add_arguments, standin_from_args, start_server
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def child_env(extra=None):
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [ROOT, env.get("PYTHONPATH")]))
+    env.update(extra or {})
+    return env
+
+
+def run_cron(workdir, base_url, args, label):
+    """
+    Run cron.py once as a separate process. Returns its stats plus the measured wall time.
+    """
+    stats_path = os.path.join(workdir, f"cron_{label}.json")
+    cmd = [sys.executable, os.path.join(ROOT, "cron.py"), "--stats-file", stats_path,
+           "--num-articles", str(args.num_articles), "--scrape-workers", str(args.scrape_workers),
+           "--analyze-workers", str(args.analyze_workers)]
+    start = time.perf_counter()
+    proc = subprocess.run(cmd, cwd=workdir, capture_output=True, text=True,
+                          env=child_env({"NEWS_RSS_URL": f"{base_url}/rss/search?q={{query}}"}))
+    wall = time.perf_counter() - start
+    if proc.returncode != 0:
+        raise RuntimeError(f"cron failed ({proc.returncode}):\n{proc.stderr[-2000:]}")
+    with open(stats_path) as f:
+        stats = json.load(f)
+    stats["process_wall_seconds"] = wall
+    stats["companies_per_second"] = stats["companies"] / wall if wall else None
+    return stats
+
+
+def start_api(workdir, port):
+    cmd = [sys.executable, "-m", "uvicorn", "api:app", "--host", "127.0.0.1", "--port", str(port),
+           "--log-level", "warning"]
+    proc = subprocess.Popen(cmd, cwd=workdir, env=child_env(), stdout=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(base_url + "/", timeout=1).status_code == 200:
+                return proc, base_url
+        except requests.RequestException:
+            pass
+        if proc.poll() is not None:
+            break
+        time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError("API server did not start")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--companies", type=int, default=50, help="Synthetic companies to process.")
+    parser.add_argument("--num-articles", type=int, default=10)
+    parser.add_argument("--scrape-workers", type=int, default=8)
+    parser.add_argument("--analyze-workers", type=int, default=2)
+    parser.add_argument("--requests", type=int, default=2000, help="Requests per endpoint in the load test.")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--output", help="Write results JSON here instead of stdout.")
+    add_arguments(parser)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="news_bench_")
+    os.makedirs(os.path.join(workdir, "data"))
+    rng = random.Random(args.seed)
+    companies = [f"Company {i:04d} {rng.choice(['Motors', 'Systems', 'Foods', 'Bank', 'Energy'])}"
+                 for i in range(args.companies)]
+    with open(os.path.join(workdir, "data", "company_list.csv"), "w") as f:
+        f.write("Company\n" + "\n".join(companies) + "\n")
+
+    standin = standin_from_args(args)
+    server, news_url = start_server(standin)
+    results = {
+        "commit": git_commit(),
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "params": vars(args),
+    }
+    try:
+        # Cold run (empty caches), then a warm re-run that should mostly hit the caches
+        results["cron_cold"] = run_cron(workdir, news_url, args, "cold")
+        results["cron_warm"] = run_cron(workdir, news_url, args, "warm")
+        results["standin_requests"] = dict(standin.requests)
+
+        proc, api_url = start_api(workdir, free_port())
+        try:
+            saved = [c for c in companies
+                     if requests.get(f"{api_url}/report/{c}", timeout=10).status_code == 200]
+            results["api"] = {
+                "reports_available": len(saved),
+                "companies": run_load(api_url, "/companies", [""], args.requests, args.concurrency),
+                "summary": run_load(api_url, "/reports/summary", [""], args.requests, args.concurrency),
+            }
+            if saved:
+                results["api"]["report"] = run_load(api_url, "/report/{}", saved, args.requests, args.concurrency)
+        finally:
+            proc.terminate()
+            proc.wait(timeout=10)
+    finally:
+        server.shutdown()
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(output + "\n")
+        print(f"Wrote {args.output}")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,34 @@
+import csv
+import os
+import threading
+
+COMPANY_LIST_PATH = os.path.join('data', 'company_list.csv')
+
+# Parsed lists by path, reused until the file's mtime or size changes
+_loaded = {}  # path -> ((mtime_ns, size), companies)
+_loaded_lock = threading.Lock()
+
+
+def read_companies(path=COMPANY_LIST_PATH):
+    """
+    Parse the company list CSV: the non-empty values of its 'Company' column, in file order.
+    """
+    with open(path, newline='', encoding='utf-8') as f:
+        return [row["Company"] for row in csv.DictReader(f) if row.get("Company")]
+
+
+def load_companies(path=COMPANY_LIST_PATH):
+    """
+    The company list, parsed once per process and re-read only when the file changes (checked
+    with one stat per call). Returns a new list each time; raises OSError if the file is missing.
+    """
+    stat = os.stat(path)
+    stamp = (stat.st_mtime_ns, stat.st_size)
+    cached = _loaded.get(path)
+    if cached is None or cached[0] != stamp:
+        with _loaded_lock:
+            cached = _loaded.get(path)
+            if cached is None or cached[0] != stamp:
+                cached = (stamp, tuple(read_companies(path)))
+                _loaded[path] = cached
+    return list(cached[1])
@@ -1,44 +1,659 @@
-import pandas as pd
-import pickle
-import re
+import argparse
+import json
+import multiprocessing
 import os
+import signal
+import socket
+import sqlite3
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
 
-from utils.news_scraper import scrape_news
+from utils.news_scraper import poll_feed, save_feed, scrape_news
 from utils.gemini_service import GeminiService
+from utils.article_cache import ArticleCache, AnalysisCache
+from utils.company_list import load_companies, read_companies
+from utils.metrics import metrics, serve_metrics
+from utils.rate_limit import RequestBudget
+from utils.report_store import ReportStore, company_key
+from utils.scheduler import MIN_INTERVAL, POPULARITY_WINDOW, REFRESH_INTERVAL, RefreshScheduler
+from utils.work_queue import QUEUE_PATH, WorkQueue
 
-def main():
+STATS_DIR = os.path.join('data', 'output', 'stats')
+# Daemon mode: status file (read by the API's /scheduler), feed validators, and how often the
+# company list, report times and API popularity are re-read
+SCHEDULER_STATUS = os.environ.get("SCHEDULER_STATUS", os.path.join('data', 'output', 'scheduler_status.json'))
+FEED_CACHE_DIR = os.path.join('data', 'cache', 'feeds')
+SYNC_SECONDS = 60
+STATUS_SECONDS = 10
+# Worker mode: workers started within the same ROUND_SECONDS window share one round of the queue,
+# and a worker with nothing left to claim re-checks for expired leases this often
+ROUND_SECONDS = float(os.environ.get("WORK_ROUND_SECONDS", 3600))
+WORKER_POLL_SECONDS = 1
+# An analysis still running after this many seconds counts as failed (its worker is replaced)
+ANALYZE_TIMEOUT = float(os.environ.get("ANALYZE_TIMEOUT", 600))
+
+# End of the company iterable in run_pipeline (None means "nothing to start yet")
+_END = object()
+
+# Per-process analysis service used by the process pool workers
+_worker_service = None
+
+
+def _init_analysis_worker(use_cache=True, llm_share=1):
+    global _worker_service
+    llm = None
+    if os.environ.get("GEMINI_API_KEY"):
+        # Each worker gets an equal share of the Gemini quota
+        from utils.llm_backend import GeminiLLM
+        llm = GeminiLLM.from_env(os.environ["GEMINI_API_KEY"], share=llm_share)
+    _worker_service = GeminiService(result_cache=AnalysisCache() if use_cache else None, llm=llm)
+
+
+def _init_pool_worker(use_cache, llm_share):
+    # Ctrl-C reaches the whole process group; the parent decides how to stop, not the workers
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _init_analysis_worker(use_cache, llm_share)
+
+
+def _analyze(company, articles):
+    """
+    Run the analysis for one company inside a pool worker. Returns (result, seconds).
+    """
+    start = time.perf_counter()
+    result = _worker_service.analyze_articles(company, articles)
+    return result, time.perf_counter() - start
+
+
+def _scrape(company, num_articles, cache):
+    """
+    Scrape one company's articles inside a scraper thread. Returns (articles, seconds).
+    """
+    start = time.perf_counter()
+    articles = scrape_news(company, num_articles=num_articles, cache=cache)
+    return articles, time.perf_counter() - start
+
+
+def _poll(company, known_links, seen_links, has_report, num_articles, cache, feed_cache, budget):
+    """
+    Daemon refresh step inside a scraper thread: a conditional feed fetch, then a scrape only if
+    the feed lists articles not covered by the last completed refresh (or there is no report
+    yet). The feed is not stored in `feed_cache` here; the daemon saves it once the refresh
+    completes. Returns ((entries, validators, new_items, articles or None), seconds), where
+    new_items counts the links not seen at the previous poll.
+    """
+    start = time.perf_counter()
+    entries, previous, validators = poll_feed(company, cache=feed_cache, budget=budget, store=False)
+    if entries is None:
+        raise RuntimeError("feed fetch failed")
+    links = {link for _, link in entries}
+    if known_links is None and previous is not None:
+        known_links = {link for _, link in previous}
+    if seen_links is None:
+        seen_links = known_links
+    new_items = len(links - seen_links) if seen_links is not None else None
+    articles = None
+    if not has_report or known_links is None or links - known_links:
+        articles = scrape_news(company, num_articles=num_articles, cache=cache, entries=entries, budget=budget)
+    return (entries, validators, new_items, articles), time.perf_counter() - start
+
+
+def _analysis_pool(analyze_workers, use_cache):
+    if analyze_workers > 0:
+        # Workers start from a clean process: a child forked from this one while a scraper thread
+        # holds a lock (metrics, stdout, urllib3's pools) would deadlock on it
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
+        return ProcessPoolExecutor(max_workers=analyze_workers, mp_context=context,
+                                   initializer=_init_pool_worker, initargs=(use_cache, analyze_workers))
+    # Analyze in-process (useful for debugging or single-core hosts)
+    _init_analysis_worker(use_cache)
+    return ThreadPoolExecutor(max_workers=1)
+
+
+class _AnalysisPool:
+    """
+    The analysis pool with a time limit per analysis. An analysis running for longer than
+    `timeout` seconds (timed from when a worker picks it up) is given up on: expired() reports
+    its company as failed, the pool is replaced so a stuck worker cannot hold up the rest of the
+    run, and the other analyses still in flight are resubmitted to the new pool. In-process
+    analysis (analyze_workers=0) cannot be stopped: the run still finishes, but the stuck thread
+    keeps the process from exiting.
+    """
+    def __init__(self, analyze_workers, use_cache, timeout=ANALYZE_TIMEOUT):
+        self.analyze_workers = analyze_workers
+        self.use_cache = use_cache
+        self.timeout = timeout
+        self.pool = _analysis_pool(analyze_workers, use_cache)
+        self._jobs = {}  # future -> [company, articles, time a worker picked it up]
+
+    def submit(self, company, articles):
+        future = self.pool.submit(_analyze, company, articles)
+        self._jobs[future] = [company, articles, None]
+        return future
+
+    def forget(self, future):
+        self._jobs.pop(future, None)
+
+    def next_check(self, now):
+        """
+        Seconds until an analysis may expire (checked every second while some are still queued),
+        or None when none are in flight.
+        """
+        waits, started = [], []
+        for future, job in self._jobs.items():
+            if future.done():
+                continue
+            if job[2] is None and not future.running():
+                waits.append(1.0)
+                continue
+            started.append(job)
+        # A process pool reports a call as running once it is queued for a worker, so only the
+        # oldest `workers` of them can be executing; the clock of the others starts over
+        started.sort(key=lambda job: job[2] if job[2] is not None else now)
+        workers = max(1, self.analyze_workers)
+        for job in started[workers:]:
+            job[2] = None
+            waits.append(1.0)
+        for job in started[:workers]:
+            if job[2] is None:
+                job[2] = now
+            waits.append(max(0.0, job[2] + self.timeout - now))
+        return min(waits, default=None)
+
+    def expired(self, now):
+        """
+        Give up on analyses that ran past the timeout. Returns (expired futures, {old future: new
+        future} for the analyses moved to a fresh pool).
+        """
+        self.next_check(now)
+        stuck = [future for future, job in self._jobs.items()
+                 if job[2] is not None and not future.done() and now - job[2] >= self.timeout]
+        if not stuck:
+            return [], {}
+        for future in stuck:
+            del self._jobs[future]
+        # Analyses that already finished keep their results (checked before the old pool is torn
+        # down, which fails everything left in it); the rest start over in a new pool
+        old_pool, old_jobs = self.pool, self._jobs
+        self._jobs = {future: job for future, job in old_jobs.items() if future.done()}
+        self._terminate(old_pool)
+        self.pool = _analysis_pool(self.analyze_workers, self.use_cache)
+        moved = {future: self.submit(company, articles)
+                 for future, (company, articles, _) in old_jobs.items() if future not in self._jobs}
+        return stuck, moved
+
+    def shutdown(self, cancel_futures=False, terminate=False):
+        """
+        Shut the pool down, waiting for running analyses unless `terminate` (then its worker
+        processes are killed).
+        """
+        if terminate:
+            self._terminate(self.pool)
+        else:
+            self.pool.shutdown(cancel_futures=cancel_futures)
+
+    @staticmethod
+    def _terminate(pool):
+        processes = list((getattr(pool, "_processes", None) or {}).values())
+        pool.shutdown(wait=False, cancel_futures=True)
+        for process in processes:
+            process.terminate()
+
+
+def _write_json(path, data):
+    """
+    Write JSON through a temp file and a rename, so readers never see a partial file.
+    """
+    directory = os.path.dirname(path) or '.'
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.json.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def run_pipeline(companies, store, scrape_workers=8, analyze_workers=2, num_articles=10, use_cache=True,
+                 tts_jobs=None, on_finished=None):
+    """
+    Process companies as a pipeline: scraping runs on a thread pool (network-bound), analysis
+    runs on a process pool (CPU-bound), and results are written to the report store as soon as
+    each company finishes.
+    A failure in any stage only skips that company. Returns a stats dict for the run.
+    With use_cache, unchanged articles are neither re-downloaded nor re-analyzed.
+    With a TTSJobManager, audio for each final summary is generated in the background.
+    `companies` may be any iterable, including a generator that yields None for "nothing to
+    start yet" (it is asked again after the next company finishes); `on_finished` is called as
+    on_finished(company, result) with result "saved", "skipped" or "failed" for every company.
+    """
+    stats = {
+        "companies": 0,
+        "saved": 0,
+        "skipped": 0,
+        "failed": 0,
+        "stage_seconds": {"scrape": 0.0, "analyze": 0.0, "save": 0.0},
+    }
+    run_start = time.perf_counter()
+    saved_before = {name: metrics.total(f"dedup_{name}_saved") for name in ("fetches", "analyses")}
+    article_cache = ArticleCache() if use_cache else None
+    scrape_pool = ThreadPoolExecutor(max_workers=max(1, scrape_workers))
+    analyze_pool = _AnalysisPool(analyze_workers, use_cache)
+    try:
+        # Keep a bounded window of companies in flight so a long list doesn't queue everything at once
+        window = max(1, scrape_workers) * 2
+        queue = iter(companies)
+        exhausted = False
+        pending = {}  # future -> (stage, company)
+        tts_keys = []
+
+        def feed():
+            nonlocal exhausted
+            while not exhausted and sum(1 for stage, _ in pending.values() if stage == "scrape") < window:
+                company = next(queue, _END)
+                if company is _END:
+                    exhausted = True
+                    return
+                if company is None:
+                    return
+                print(f"Processing company: {company}...")
+                stats["companies"] += 1
+                pending[scrape_pool.submit(_scrape, company, num_articles, article_cache)] = ("scrape", company)
+
+        def finish(company, result, stage):
+            stats[result] += 1
+            metrics.inc("cron_companies", result=result, stage=stage)
+            if on_finished is not None:
+                on_finished(company, result)
+
+        feed()
+        while pending or not exhausted:
+            if not pending:
+                feed()
+                continue
+            timeout = analyze_pool.next_check(time.monotonic())
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, company = pending.pop(future)
+                analyze_pool.forget(future)
+                try:
+                    value, seconds = future.result()
+                except Exception as e:
+                    print(f"Error during {stage} for {company}: {e}")
+                    finish(company, "failed", stage)
+                    continue
+                stats["stage_seconds"][stage] += seconds
+                metrics.observe("cron_stage", seconds, stage=stage)
+                if stage == "scrape":
+                    if not value:
+                        print(f"No articles found or unable to scrape for {company}. Skipping.")
+                        finish(company, "skipped", stage)
+                        continue
+                    try:
+                        pending[analyze_pool.submit(company, value)] = ("analyze", company)
+                    except Exception as e:
+                        print(f"Error during analyze for {company}: {e}")
+                        finish(company, "failed", "analyze")
+                else:
+                    save_start = time.perf_counter()
+                    try:
+                        run_id = store.save_report(company, value)
+                        print(f"Saved analysis for {company} (run {run_id})")
+                        finish(company, "saved", "save")
+                        if tts_jobs is not None and value.get("Final Sentiment Analysis"):
+                            tts_keys.append(tts_jobs.submit(value["Final Sentiment Analysis"]))
+                    except Exception as e:
+                        print(f"Error saving output for {company}: {e}")
+                        finish(company, "failed", "save")
+                    save_seconds = time.perf_counter() - save_start
+                    stats["stage_seconds"]["save"] += save_seconds
+                    metrics.observe("cron_stage", save_seconds, stage="save")
+            expired, moved = analyze_pool.expired(time.monotonic())
+            for old, new in moved.items():
+                pending[new] = pending.pop(old)
+            for future in expired:
+                _, company = pending.pop(future)
+                print(f"Error during analyze for {company}: timed out after {analyze_pool.timeout:.0f}s")
+                finish(company, "failed", "analyze")
+            feed()
+        if tts_keys:
+            print(f"Waiting for {len(tts_keys)} TTS job(s)...")
+            tts_start = time.perf_counter()
+            stats["tts_failed"] = sum(1 for key in tts_keys if tts_jobs.wait(key) != "ready")
+            stats["stage_seconds"]["tts"] = time.perf_counter() - tts_start
+    finally:
+        scrape_pool.shutdown()
+        analyze_pool.shutdown()
+    stats["wall_seconds"] = time.perf_counter() - run_start
+    # Near-duplicate stories skipped while scraping (scraping runs in this process)
+    stats["dedup"] = {f"{name}_saved": metrics.total(f"dedup_{name}_saved") - before
+                      for name, before in saved_before.items()}
+    return stats
+
+
+def run_worker(queue, store, companies, round_id, owner=None, poll_seconds=WORKER_POLL_SECONDS, **pipeline_args):
+    """
+    Process one round of the shared work queue together with any other workers: enqueue the
+    round (idempotent), then run the pipeline over companies claimed one at a time, renewing the
+    leases in the background and completing each company as it finishes. Keeps going until no
+    company of the round is pending or leased, taking over the leases of workers that died.
+    Returns the run_pipeline stats for the companies this worker processed.
+    """
+    owner = owner or f"{socket.gethostname()}:{os.getpid()}"
+    armed = queue.enqueue(companies, round_id)
+    print(f"Worker {owner}: round {round_id}, {armed} companies enqueued by this worker")
+    held = set()
+    lost = []
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(queue.lease_seconds / 3):
+            try:
+                queue.renew(owner)
+            except sqlite3.Error as e:
+                print(f"Could not renew leases: {e}")
+
+    def claims():
+        while True:
+            company = queue.claim(owner)
+            if company is not None:
+                held.add(company)
+                yield company
+            elif held:
+                # Own work is still in flight; ask again once some of it finishes
+                yield None
+            elif queue.unfinished():
+                # Others hold the rest; wait for them to finish or for their leases to expire
+                time.sleep(poll_seconds)
+            else:
+                return
+
+    def finished(company, result):
+        held.discard(company)
+        try:
+            if not queue.complete(company, owner, ok=result != "failed"):
+                lost.append(company)
+                print(f"Lease on {company} had expired; another worker may have processed it too.")
+        except sqlite3.Error as e:
+            print(f"Could not complete {company} in the work queue: {e}")
+
+    thread = threading.Thread(target=heartbeat, daemon=True)
+    thread.start()
+    try:
+        stats = run_pipeline(claims(), store, on_finished=finished, **pipeline_args)
+    finally:
+        stop.set()
+        thread.join()
+    stats["worker"] = {"owner": owner, "round": round_id, "leases_lost": lost, "queue": queue.status()}
+    return stats
+
+
+def _sync_scheduler(scheduler, store):
+    """
+    Re-read the company list (only parsed again when the file changed), the time of each new
+    company's newest report, and API popularity.
+    """
+    companies = load_companies()
+    new = [company for company in companies if company not in scheduler.states]
+    last_reports = {}
+    if new:
+        _, rows = store.summaries(new)
+        reported = {company_key(row["company"]): row["created_at"] for row in rows}
+        last_reports = {company: reported[company_key(company)] for company in new
+                        if company_key(company) in reported}
+    scheduler.set_companies(companies, last_reports)
+    hits = store.popularity(since=time.time() - POPULARITY_WINDOW)
+    scheduler.set_popularity({company: hits.get(company_key(company), 0) for company in companies})
+
+
+def _publish_status(scheduler, status_path, started_at):
+    now = time.time()
+    status = scheduler.status(now)
+    metrics.set("scheduler_queue_depth", status["queue_depth"])
+    metrics.set("scheduler_in_flight", status["in_flight"])
+    for stat, value in status["freshness_lag_seconds"].items():
+        metrics.set("scheduler_freshness_lag_seconds", value, stat=stat)
+    status.update(updated_at=now, started_at=started_at, pid=os.getpid(), metrics=metrics.snapshot())
+    try:
+        _write_json(status_path, status)
+    except OSError as e:
+        print(f"Could not write scheduler status: {e}")
+
+
+def run_daemon(store, scrape_workers=8, analyze_workers=2, num_articles=10, use_cache=True, tts_jobs=None,
+               refresh_interval=REFRESH_INTERVAL, min_interval=MIN_INTERVAL, status_path=SCHEDULER_STATUS,
+               stop=None):
+    """
+    Keep companies fresh until `stop` (a threading.Event) is set. A RefreshScheduler picks the
+    next company by staleness, news velocity and API popularity; its feed is fetched
+    conditionally and its articles are only scraped, analyzed and saved when the feed has new
+    items. All downloads share one RequestBudget (CRAWL_RPM overall, CRAWL_HOST_RPM per host).
+    Queue depth and freshness lag go to `status_path` and the scheduler_* gauges.
+    Once `stop` is set no new refreshes start, and those in progress are finished and saved
+    before returning; anything still running if the loop is interrupted (e.g. by an exception
+    such as SystemExit from a second signal) is dropped.
+    """
+    stop = stop or threading.Event()
+    started_at = time.time()
+    scheduler = RefreshScheduler(interval=refresh_interval, min_interval=min_interval)
+    budget = RequestBudget.from_env()
+    article_cache = ArticleCache() if use_cache else None
+    feed_cache = ArticleCache(FEED_CACHE_DIR)
+    scrape_pool = ThreadPoolExecutor(max_workers=max(1, scrape_workers))
+    analyze_pool = _AnalysisPool(analyze_workers, use_cache)
+    pending = {}  # future -> (stage, company)
+    polled = {}   # company -> (feed entries, validators) of the poll being processed
+
+    def finish(company, result, now):
+        # The feed (and the scheduler's known links) only move on once its stories are handled,
+        # so a refresh that fails or scrapes nothing is repeated on the next poll
+        entries, validators = polled.pop(company, (None, None))
+        if result in ("saved", "unchanged") and validators is not None:
+            save_feed(company, entries, feed_cache, **validators)
+        scheduler.finish(company, now, result)
+
+    next_sync = next_status = 0.0
+    try:
+        while not stop.is_set() or pending:
+            now = time.time()
+            stopping = stop.is_set()
+            if now >= next_sync and not stopping:
+                try:
+                    _sync_scheduler(scheduler, store)
+                except Exception as e:
+                    print(f"Could not refresh the company list or popularity: {e}")
+                next_sync = now + SYNC_SECONDS
+            scrape_slots = 0 if stopping else max(1, scrape_workers)
+            while sum(1 for stage, _ in pending.values() if stage == "scrape") < scrape_slots:
+                company = scheduler.next_due(now)
+                if company is None:
+                    break
+                state = scheduler.states[company]
+                pending[scrape_pool.submit(_poll, company, state.known_links, state.seen_links, state.has_report,
+                                           num_articles, article_cache, feed_cache, budget)] = ("scrape", company)
+            if now >= next_status:
+                _publish_status(scheduler, status_path, started_at)
+                next_status = now + STATUS_SECONDS
+            timeout = min(x for x in (scheduler.seconds_until_due(now), next_sync - now, next_status - now, 1.0)
+                          if x is not None)
+            if not pending:
+                stop.wait(max(0.0, timeout))
+                continue
+            done, _ = wait(pending, timeout=max(0.0, timeout), return_when=FIRST_COMPLETED)
+            for future in done:
+                stage, company = pending.pop(future)
+                analyze_pool.forget(future)
+                now = time.time()
+                try:
+                    value, seconds = future.result()
+                except Exception as e:
+                    print(f"Error during {stage} for {company}: {e}")
+                    metrics.inc("cron_companies", result="failed", stage=stage)
+                    finish(company, "failed", now)
+                    continue
+                metrics.observe("cron_stage", seconds, stage=stage)
+                if stage == "scrape":
+                    entries, validators, new_items, articles = value
+                    scheduler.record_poll(company, [link for _, link in entries], new_items, now)
+                    polled[company] = (entries, validators)
+                    if not articles:
+                        result = "unchanged" if articles is None else "skipped"
+                        metrics.inc("cron_companies", result=result, stage=stage)
+                        finish(company, result, now)
+                        continue
+                    try:
+                        pending[analyze_pool.submit(company, articles)] = ("analyze", company)
+                    except Exception as e:
+                        print(f"Error during analyze for {company}: {e}")
+                        metrics.inc("cron_companies", result="failed", stage="analyze")
+                        finish(company, "failed", now)
+                else:
+                    try:
+                        with metrics.timer("cron_stage", stage="save"):
+                            run_id = store.save_report(company, value)
+                        print(f"Saved analysis for {company} (run {run_id})")
+                        metrics.inc("cron_companies", result="saved", stage="save")
+                        finish(company, "saved", time.time())
+                        if tts_jobs is not None and value.get("Final Sentiment Analysis"):
+                            tts_jobs.submit(value["Final Sentiment Analysis"])
+                    except Exception as e:
+                        print(f"Error saving output for {company}: {e}")
+                        metrics.inc("cron_companies", result="failed", stage="save")
+                        finish(company, "failed", now)
+            expired, moved = analyze_pool.expired(time.monotonic())
+            for old, new in moved.items():
+                pending[new] = pending.pop(old)
+            for future in expired:
+                _, company = pending.pop(future)
+                print(f"Error during analyze for {company}: timed out after {analyze_pool.timeout:.0f}s")
+                metrics.inc("cron_companies", result="failed", stage="analyze")
+                finish(company, "failed", time.time())
+    finally:
+        # Only left with work pending when interrupted: drop it instead of waiting for it
+        for future in pending:
+            future.cancel()
+        scrape_pool.shutdown(wait=not pending, cancel_futures=True)
+        analyze_pool.shutdown(cancel_futures=True, terminate=bool(pending))
+        _publish_status(scheduler, status_path, started_at)
+
+
+def print_summary(stats):
+    wall = stats["wall_seconds"]
+    rate = stats["companies"] / wall if wall > 0 else 0.0
+    print(f"Processed {stats['companies']} companies in {wall:.1f}s ({rate:.2f} companies/s): "
+          f"{stats['saved']} saved, {stats['skipped']} skipped, {stats['failed']} failed.")
+    for stage, seconds in stats["stage_seconds"].items():
+        print(f"  {stage}: {seconds:.1f}s total across workers")
+    dedup = stats.get("dedup")
+    if dedup and any(dedup.values()):
+        print(f"  duplicates skipped: {dedup['fetches_saved']} fetches, {dedup['analyses_saved']} analyses")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Scrape and analyze news for every company in the list.")
+    parser.add_argument("--scrape-workers", type=int, default=int(os.environ.get("SCRAPE_WORKERS", 8)),
+                        help="Companies scraped concurrently (threads).")
+    parser.add_argument("--analyze-workers", type=int, default=int(os.environ.get("ANALYZE_WORKERS", os.cpu_count() or 1)),
+                        help="Analysis processes; 0 analyzes in the main process.")
+    parser.add_argument("--num-articles", type=int, default=10, help="Articles to fetch per company.")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="Re-download and re-analyze every article instead of using data/cache.")
+    parser.add_argument("--db", default=os.environ.get("REPORT_DB", os.path.join('data', 'reports.db')),
+                        help="Report store (SQLite) path.")
+    parser.add_argument("--pregenerate-tts", action="store_true",
+                        help="Generate Hindi audio for each company's final summary after analysis.")
+    parser.add_argument("--stats-file",
+                        help=f"Write the run's stats and metrics as JSON to this path (default: {STATS_DIR}/run-<time>.json).")
+    parser.add_argument("--import-pickles", action="store_true",
+                        help="Import legacy data/output/*.pkl reports into the store and exit.")
+    parser.add_argument("--worker", action="store_true",
+                        help="Share the company list with other workers through a lease-based work queue.")
+    parser.add_argument("--queue", default=os.environ.get("WORK_QUEUE_DB", QUEUE_PATH),
+                        help="Worker: work queue (SQLite) path, shared by all workers.")
+    parser.add_argument("--round", type=int,
+                        help=f"Worker: round id (default: current time // WORK_ROUND_SECONDS, {ROUND_SECONDS:.0f}s).")
+    parser.add_argument("--daemon", action="store_true",
+                        help="Run until stopped, refreshing companies by priority instead of all once.")
+    parser.add_argument("--refresh-interval", type=float, default=REFRESH_INTERVAL,
+                        help="Daemon: refresh interval of a company without new stories or API traffic (seconds).")
+    parser.add_argument("--min-interval", type=float, default=MIN_INTERVAL,
+                        help="Daemon: shortest refresh interval of any company (seconds).")
+    parser.add_argument("--status-file", default=SCHEDULER_STATUS,
+                        help="Daemon: where to write queue depth and freshness lag.")
+    parser.add_argument("--metrics-port", type=int,
+                        help="Daemon: serve Prometheus metrics on this port.")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    store = ReportStore(args.db)
+    if args.import_pickles:
+        count = store.import_pickles(os.path.join('data', 'output'))
+        print(f"Imported {count} legacy report(s) into {args.db}")
+        return
+    os.makedirs('data/output', exist_ok=True)
+    tts_jobs = None
+    if args.pregenerate_tts:
+        from utils.text_to_speech import TTSJobManager
+        tts_jobs = TTSJobManager()
+    if args.daemon:
+        if args.metrics_port:
+            serve_metrics(args.metrics_port)
+        stop = threading.Event()
+        # SIGTERM / Ctrl-C: start no new refreshes, finish and save those in progress; a second
+        # signal exits at once, dropping them
+        def on_signal(*_):
+            if stop.is_set():
+                raise SystemExit("Refresh daemon interrupted, refreshes in progress dropped")
+            print("Stopping: finishing the refreshes in progress (signal again to exit now)")
+            stop.set()
+
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, on_signal)
+        print(f"Refresh daemon started (interval {args.refresh_interval:.0f}s, min {args.min_interval:.0f}s)")
+        run_daemon(store, scrape_workers=args.scrape_workers, analyze_workers=args.analyze_workers,
+                   num_articles=args.num_articles, use_cache=not args.no_cache, tts_jobs=tts_jobs,
+                   refresh_interval=args.refresh_interval, min_interval=args.min_interval,
+                   status_path=args.status_file, stop=stop)
+        print("Refresh daemon stopped")
+        return
     # Read list of companies from CSV
     try:
-        df = pd.read_csv('data/company_list.csv')
+        companies = read_companies()
     except Exception as e:
         print(f"Failed to read company list: {e}")
         return
-    companies = df['Company'].dropna().tolist()
     if not companies:
         print("No companies found in the list.")
         return
 
-    service = GeminiService(api_key=None)  # Initialize the Gemini service (mock or real API if key provided)
-    os.makedirs('data/output', exist_ok=True)
+    pipeline_args = {"scrape_workers": args.scrape_workers, "analyze_workers": args.analyze_workers,
+                     "num_articles": args.num_articles, "use_cache": not args.no_cache, "tts_jobs": tts_jobs}
+    if args.worker:
+        round_id = args.round if args.round is not None else int(time.time() // ROUND_SECONDS)
+        stats = run_worker(WorkQueue(args.queue), store, companies, round_id, **pipeline_args)
+    else:
+        stats = run_pipeline(companies, store, **pipeline_args)
+    print_summary(stats)
+    # Per-run stats file: the pipeline totals plus every hot-path timer/counter from this process
+    stats["finished_at"] = time.time()
+    stats["metrics"] = metrics.snapshot()
+    stats_file = args.stats_file
+    if not stats_file:
+        os.makedirs(STATS_DIR, exist_ok=True)
+        name = time.strftime("run-%Y%m%dT%H%M%SZ", time.gmtime())
+        if args.worker:
+            # Several workers may finish in the same second
+            name += f"-{socket.gethostname()}-{os.getpid()}"
+        stats_file = os.path.join(STATS_DIR, f"{name}.json")
+    _write_json(stats_file, stats)
+    print(f"Run stats written to {stats_file}")
 
-    for company in companies:
-        print(f"Processing company: {company}...")
-        # Scrape news articles for the company
-        articles = scrape_news(company, num_articles=10)
-        if not articles:
-            print(f"No articles found or unable to scrape for {company}. Skipping.")
-            continue
-        # Analyze articles using the Gemini service (LLM)
-        result = service.analyze_articles(company, articles)
-        # Save the result as a pickle file
-        filename_base = re.sub(r'\W+', '_', company.lower())
-        file_path = os.path.join('data', 'output', f"{filename_base}.pkl")
-        try:
-            with open(file_path, 'wb') as f:
-                pickle.dump(result, f)
-            print(f"Saved analysis for {company} to {file_path}")
-        except Exception as e:
-            print(f"Error saving output for {company}: {e}")
 
 if __name__ == "__main__":
     main()
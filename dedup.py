@@ -0,0 +1,101 @@
+import hashlib
+import os
+import re
+from collections import Counter
+
+# Titles whose word sets overlap at least this much (Jaccard) are treated as the same story;
+# above 1 disables title dedup
+TITLE_THRESHOLD = float(os.environ.get("NEWS_DEDUP_TITLE_THRESHOLD", 0.75))
+# Articles whose 64-bit SimHash fingerprints differ in at most this many bits are treated as
+# copies of the same text; below 0 disables content dedup
+SIMHASH_DISTANCE = int(os.environ.get("NEWS_DEDUP_SIMHASH_DISTANCE", 3))
+SHINGLE_WORDS = 3
+
+_WORD_RE = re.compile(r"\w+")
+
+
+def title_tokens(title):
+    """
+    Normalized word set of a headline: words lowercased with punctuation, possessives and plural
+    "s" dropped. The " - Publisher" suffix Google News appends is expected to be stripped already
+    (the scraper removes it using the item's <source>), since " - " also occurs inside headlines.
+    """
+    return frozenset(word[:-1] if word.endswith("s") and len(word) > 3 else word
+                     for word in _WORD_RE.findall(title.lower().replace("'s", "")))
+
+
+def jaccard(a, b):
+    if not a or not b:
+        return 0.0
+    return len(a & b) / len(a | b)
+
+
+def simhash(text, shingle_words=SHINGLE_WORDS):
+    """
+    64-bit SimHash of a text over its distinct word shingles. Bit counts are gathered per byte
+    of the shingle hashes (8 counters per hash instead of 64 bit tests).
+    """
+    words = _WORD_RE.findall(text.lower())
+    if len(words) < shingle_words:
+        shingles = {" ".join(words)}
+    else:
+        shingles = {" ".join(words[i:i + shingle_words]) for i in range(len(words) - shingle_words + 1)}
+    digests = [hashlib.blake2b(s.encode("utf-8"), digest_size=8).digest() for s in shingles]
+    half = len(digests) / 2
+    fingerprint = 0
+    for position in range(8):
+        ones = [0] * 8
+        for byte, count in Counter(d[position] for d in digests).items():
+            for bit in range(8):
+                if byte >> bit & 1:
+                    ones[bit] += count
+        for bit in range(8):
+            if ones[bit] > half:
+                fingerprint |= 1 << (position * 8 + bit)
+    return fingerprint
+
+
+def hamming(a, b):
+    return bin(a ^ b).count("1")
+
+
+class Deduplicator:
+    """
+    Near-duplicate filter for one company's feed: headlines are compared before anything is
+    fetched, and extracted article texts are compared by SimHash before they are analyzed.
+    Not thread-safe; the scraper calls it from the thread that collects results.
+    """
+    def __init__(self, title_threshold=TITLE_THRESHOLD, max_distance=SIMHASH_DISTANCE):
+        self.title_threshold = title_threshold
+        self.max_distance = max_distance
+        self.fingerprints = []
+
+    def filter_titles(self, entries):
+        """
+        Drop feed entries (title, link) whose headline matches an earlier one. Returns
+        (kept_entries, dropped_positions) where positions index into `entries`.
+        """
+        if self.title_threshold > 1:
+            return list(entries), []
+        kept, kept_tokens, dropped = [], [], []
+        for position, entry in enumerate(entries):
+            tokens = title_tokens(entry[0])
+            if tokens and any(jaccard(tokens, other) >= self.title_threshold for other in kept_tokens):
+                dropped.append(position)
+                continue
+            kept.append(entry)
+            kept_tokens.append(tokens)
+        return kept, dropped
+
+    def is_duplicate(self, content):
+        """
+        True if `content` is a near copy of an article already accepted; otherwise it is
+        remembered as accepted.
+        """
+        if self.max_distance < 0:
+            return False
+        fingerprint = simhash(content)
+        if any(hamming(fingerprint, other) <= self.max_distance for other in self.fingerprints):
+            return True
+        self.fingerprints.append(fingerprint)
+        return False
@@ -1,93 +1,252 @@
-# Note: In a real scenario, you would integrate Google Generative AI (Gemini) here.
-# For this mock implementation, we generate summaries, topics, and sentiments with simple heuristics.
+# Summaries, topics and sentiments come from Gemini when an API key (or LLM backend) is given,
+# and from simple keyword heuristics otherwise or whenever the LLM cannot answer in time.
 import re
 
+from utils.article_cache import AnalysisCache, content_hash
+from utils.metrics import metrics
+
+# Keywords for simplistic sentiment analysis
+POSITIVE_KEYWORDS = ["positive", "growth", "good", "great", "record", "increase", "profit", "success", "upbeat", "achievement"]
+NEGATIVE_KEYWORDS = ["negative", "decline", "bad", "decrease", "loss", "fall", "down", "risk", "concern", "issue", "scandal"]
+# Rule-based topics: a topic applies when every group has at least one keyword present in the text
+TOPIC_RULES = [
+    ("Electric Vehicles", (("electric",), ("vehicle",))),
+    ("Stock Market", (("stock", "market"),)),
+    ("Innovation", (("innovation", "innovative"),)),
+    ("Regulations", (("regulation", "regulator"),)),
+    ("Autonomous Vehicles", (("autonomous", "self-driving"),)),
+    ("Mergers & Acquisitions", (("merger", "acquisition"),)),
+    ("Financial Performance", (("profit", "earnings", "quarter"),)),
+]
+PROPER_NOUN_PATTERN = r'\b[A-Z][a-zA-Z]+\b'
+MAX_TOPICS = 5
+# Bump when the heuristics change so cached per-article results are not reused
+ANALYSIS_VERSION = 1
+
+
+class KeywordMatcher:
+    """
+    Precompiled keyword tables for sentiment counting and topic extraction, built once per service.
+    Proper nouns are read lazily, so the scan stops as soon as the topic limit is reached instead of
+    collecting every capitalized word in the article.
+    """
+    def __init__(self, positive_keywords=None, negative_keywords=None, topic_rules=None):
+        self.positive_keywords = tuple(positive_keywords or POSITIVE_KEYWORDS)
+        self.negative_keywords = tuple(negative_keywords or NEGATIVE_KEYWORDS)
+        self.topic_rules = tuple(topic_rules or TOPIC_RULES)
+        self.proper_noun_re = re.compile(PROPER_NOUN_PATTERN)
+
+    def match(self, company_name, content):
+        """
+        Scan one article. Returns (positive_count, negative_count, topics_set).
+        """
+        text_lower = content.lower()
+        pos_count = sum(map(text_lower.count, self.positive_keywords))
+        neg_count = sum(map(text_lower.count, self.negative_keywords))
+        # Rule-based topic extraction
+        topics_set = set()
+        contains = text_lower.__contains__
+        for topic, groups in self.topic_rules:
+            for group in groups:
+                if not any(map(contains, group)):
+                    break
+            else:
+                topics_set.add(topic)
+        # Extract capitalized words (proper nouns) as potential topics, excluding the company name
+        company_lower = company_name.lower()
+        if len(topics_set) < MAX_TOPICS:
+            for match in self.proper_noun_re.finditer(content):
+                word = match.group()
+                if word.lower() == company_lower:
+                    continue
+                if len(topics_set) >= MAX_TOPICS:  # limit the number of topics
+                    break
+                # Add the word if it seems like a relevant proper noun
+                topics_set.add(word)
+        return pos_count, neg_count, topics_set
+
+
 class GeminiService:
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, result_cache=None, llm=None):
         """
-        Initialize the Gemini service. If an API key is provided and the Google Generative AI 
-        SDK is available, you could configure it here. (Using mock implementation by default.)
+        Initialize the Gemini service. With an API key, articles are analyzed by the batched
+        Gemini backend (utils.llm_backend.GeminiLLM); `llm` passes a configured backend instead.
+        Without either, the keyword heuristics are used.
+        `result_cache` is an optional AnalysisCache used to reuse results for unchanged articles.
         """
-        if api_key:
-            # Example: Configure the real Gemini API client with the provided key (if library is available)
-            # import google.generativeai as genai
-            # genai.configure(api_key=api_key)
-            pass
+        if llm is None and api_key:
+            from utils.llm_backend import GeminiLLM
+            llm = GeminiLLM.from_env(api_key)
+        self.llm = llm
+        self.matcher = KeywordMatcher()
+        self.result_cache = result_cache
+
+    def analyze_batch(self, companies_articles):
+        """
+        Analyze several companies at once, sharing the precompiled matcher.
+        Accepts a dict (or iterable of pairs) mapping company name to its articles and
+        returns a dict mapping company name to its analysis result.
+        """
+        if isinstance(companies_articles, dict):
+            companies_articles = companies_articles.items()
+        companies_articles = [(company, list(articles)) for company, articles in companies_articles]
+        if self.llm is None:
+            return {company: self.analyze_articles(company, articles) for company, articles in companies_articles}
+        # One pass over every article, so LLM requests are packed across companies
+        with metrics.timer("analyze_articles"):
+            analyzed = iter(self._analyze_many([(company, art) for company, articles in companies_articles
+                                                for art in articles]))
+            results = {}
+            for company, articles in companies_articles:
+                analysis = self.start_analysis(company)
+                for _ in articles:
+                    analysis.add_result(*next(analyzed))
+                results[company] = analysis.result()
+            return results
+
+    def _analyze_many(self, items):
+        """
+        Analyze (company, article) pairs. Returns a list of (article_result, topics_set).
+        With an LLM backend, cached LLM results are reused, the rest go to the backend in
+        batches, and anything it could not answer falls back to the heuristics.
+        """
+        if self.llm is None:
+            return [self._analyze_article(company_name, art) for company_name, art in items]
+        results = [None] * len(items)
+        todo = []
+        for index, (company_name, art) in enumerate(items):
+            cached = self.result_cache.get(self.llm.cache_key(company_name, art)) if self.result_cache else None
+            if cached is not None:
+                results[index] = cached
+            else:
+                todo.append(index)
+        if todo:
+            answers = self.llm.analyze([items[index] for index in todo])
+            for index, article_result in zip(todo, answers):
+                if article_result is None:
+                    continue
+                results[index] = article_result
+                if self.result_cache is not None:
+                    try:
+                        self.result_cache.put(self.llm.cache_key(*items[index]), article_result)
+                    except OSError as e:
+                        print(f"Could not cache analysis result: {e}")
+        return [(article_result, set(article_result["Topics"])) if article_result is not None
+                else self._analyze_article(*items[index])
+                for index, article_result in enumerate(results)]
+
+    def _analyze_article(self, company_name, art):
+        """
+        Summarize one article and work out its sentiment and topics.
+        Returns (article_result, topics_set). Results are looked up in the result cache first.
+        """
+        if self.result_cache is None:
+            return self._compute_article(company_name, art)
+        article_hash = art.get("content_hash") or content_hash(art.get("content", ""))
+        key = AnalysisCache.key(ANALYSIS_VERSION, company_name, art.get("title", ""), article_hash)
+        article_result = self.result_cache.get(key)
+        if article_result is not None:
+            return article_result, set(article_result["Topics"])
+        article_result, topics_set = self._compute_article(company_name, art)
+        try:
+            self.result_cache.put(key, article_result)
+        except OSError as e:
+            print(f"Could not cache analysis result: {e}")
+        return article_result, topics_set
+
+    def _compute_article(self, company_name, art):
+        title = art.get("title", "")
+        content = art.get("content", "")
+        # Generate a brief summary (e.g., first 1-2 sentences)
+        sentences = content.replace('\n', ' ').split('.')
+        summary = sentences[0].strip()
+        if len(sentences) > 1:
+            summary += ". " + sentences[1].strip()
+        if len(sentences) > 2:
+            summary += "..."
+        # Determine sentiment (very basic heuristic based on keyword counts)
+        pos_count, neg_count, topics_set = self.matcher.match(company_name, content)
+        if pos_count > neg_count:
+            sentiment = "Positive"
+        elif neg_count > pos_count:
+            sentiment = "Negative"
+        else:
+            sentiment = "Neutral"
+        article_result = {
+            "Title": title,
+            "Summary": summary,
+            "Sentiment": sentiment,
+            "Topics": list(topics_set)
+        }
+        return article_result, topics_set
+
+    def start_analysis(self, company_name):
+        """
+        Begin an incremental analysis for one company (see IncrementalAnalysis).
+        """
+        return IncrementalAnalysis(self, company_name)
 
     def analyze_articles(self, company_name, articles):
         """
         Analyze the given articles (list of dicts with 'title' and 'content').
         Returns a dictionary containing summaries, topics, sentiment analysis, and comparative analysis.
         """
-        result = {"Company": company_name, "Articles": []}
-        # Define some keywords for simplistic sentiment analysis and topic extraction
-        positive_keywords = ["positive", "growth", "good", "great", "record", "increase", "profit", "success", "upbeat", "achievement"]
-        negative_keywords = ["negative", "decline", "bad", "decrease", "loss", "fall", "down", "risk", "concern", "issue", "scandal"]
-        # Analyze each article
-        all_topics = []  # to collect topics for overlap analysis
-        for art in articles:
-            title = art.get("title", "")
-            content = art.get("content", "")
-            # Generate a brief summary (e.g., first 1-2 sentences)
-            sentences = content.replace('\n', ' ').split('.')
-            summary = sentences[0].strip()
-            if len(sentences) > 1:
-                summary += ". " + sentences[1].strip()
-            if len(sentences) > 2:
-                summary += "..."
-            # Determine sentiment (very basic heuristic based on keyword counts)
-            text_lower = content.lower()
-            pos_count = sum(text_lower.count(word) for word in positive_keywords)
-            neg_count = sum(text_lower.count(word) for word in negative_keywords)
-            if pos_count > neg_count:
-                sentiment = "Positive"
-            elif neg_count > pos_count:
-                sentiment = "Negative"
-            else:
-                sentiment = "Neutral"
-            # Extract topics (using simple keyword matching and proper nouns)
-            topics_set = set()
-            # Rule-based topic extraction
-            if "electric" in text_lower and "vehicle" in text_lower:
-                topics_set.add("Electric Vehicles")
-            if "stock" in text_lower or "market" in text_lower:
-                topics_set.add("Stock Market")
-            if "innovation" in text_lower or "innovative" in text_lower:
-                topics_set.add("Innovation")
-            if "regulation" in text_lower or "regulator" in text_lower:
-                topics_set.add("Regulations")
-            if "autonomous" in text_lower or "self-driving" in text_lower:
-                topics_set.add("Autonomous Vehicles")
-            if "merger" in text_lower or "acquisition" in text_lower:
-                topics_set.add("Mergers & Acquisitions")
-            if "profit" in text_lower or "earnings" in text_lower or "quarter" in text_lower:
-                topics_set.add("Financial Performance")
-            # Extract capitalized words (proper nouns) as potential topics, excluding the company name
-            for word in re.findall(r'\b[A-Z][a-zA-Z]+\b', content):
-                if word.lower() == company_name.lower():
-                    continue
-                if len(topics_set) >= 5:  # limit the number of topics
-                    break
-                # Add the word if it seems like a relevant proper noun
-                topics_set.add(word)
-            topics = list(topics_set)
-            all_topics.append(topics_set)
-            # Append analyzed article data
-            result["Articles"].append({
-                "Title": title,
-                "Summary": summary,
-                "Sentiment": sentiment,
-                "Topics": topics
-            })
-        # Comparative Sentiment Analysis
-        positive_count = sum(1 for art in result["Articles"] if art["Sentiment"] == "Positive")
-        negative_count = sum(1 for art in result["Articles"] if art["Sentiment"] == "Negative")
-        neutral_count = sum(1 for art in result["Articles"] if art["Sentiment"] == "Neutral")
-        sentiment_dist = {
-            "Positive": positive_count,
-            "Negative": negative_count,
-            "Neutral": neutral_count
+        with metrics.timer("analyze_articles"):
+            analysis = self.start_analysis(company_name)
+            for article_result, topics_set in self._analyze_many([(company_name, art) for art in articles]):
+                analysis.add_result(article_result, topics_set)
+            return analysis.result()
+
+
+class IncrementalAnalysis:
+    """
+    Analysis state for one company that is updated one article at a time, so partial results
+    (sentiment distribution, topic overlap) are available while articles are still arriving.
+    Feeding all articles and calling result() gives the same report as analyze_articles.
+    """
+    def __init__(self, service, company_name):
+        self.service = service
+        self.company_name = company_name
+        self.articles = []
+        self.all_topics = []  # to collect topics for overlap analysis
+        self.topic_counts = {}
+        self.sentiment_counts = {"Positive": 0, "Negative": 0, "Neutral": 0}
+
+    def add(self, art):
+        """
+        Analyze one more article and fold it into the running totals. Returns the article result.
+        """
+        article_result, topics_set = self.service._analyze_many([(self.company_name, art)])[0]
+        return self.add_result(article_result, topics_set)
+
+    def add_result(self, article_result, topics_set):
+        """
+        Fold an already analyzed article into the running totals. Returns the article result.
+        """
+        self.articles.append(article_result)
+        self.all_topics.append(topics_set)
+        self.sentiment_counts[article_result["Sentiment"]] += 1
+        for t in topics_set:
+            self.topic_counts[t] = self.topic_counts.get(t, 0) + 1
+        return article_result
+
+    def sentiment_distribution(self):
+        return dict(self.sentiment_counts)
+
+    def topic_overlap(self):
+        # Topics that appear in at least 2 articles, plus the unique topics of each article
+        common_topics = [t for t, count in self.topic_counts.items() if count > 1]
+        topic_overlap = {
+            "Common Topics": common_topics
         }
+        for idx, topics_set in enumerate(self.all_topics, start=1):
+            unique_topics = [t for t in topics_set if self.topic_counts.get(t, 0) == 1]
+            topic_overlap[f"Unique Topics in Article {idx}"] = unique_topics
+        return topic_overlap
+
+    def coverage_differences(self):
+        positive_count = self.sentiment_counts["Positive"]
+        negative_count = self.sentiment_counts["Negative"]
         # Coverage Differences (simple comparative statements)
         coverage_diffs = []
         if positive_count > 0 and negative_count > 0:
@@ -118,24 +277,13 @@ class GeminiService:
                 "Comparison": "All articles maintain a neutral tone without strong positive or negative language.",
                 "Impact": "The coverage appears unbiased and factual, giving no clear indication of sentiment."
             })
-        # Topic Overlap analysis
-        common_topics = []
-        unique_topics_map = {}
-        if all_topics:
-            # Find topics that appear in at least 2 articles
-            topic_counts = {}
-            for topics_set in all_topics:
-                for t in topics_set:
-                    topic_counts[t] = topic_counts.get(t, 0) + 1
-            common_topics = [t for t, count in topic_counts.items() if count > 1]
-            # Unique topics per article
-            for idx, topics_set in enumerate(all_topics, start=1):
-                unique_topics = [t for t in topics_set if topic_counts.get(t, 0) == 1]
-                unique_topics_map[f"Unique Topics in Article {idx}"] = unique_topics
-        topic_overlap = {
-            "Common Topics": common_topics
-        }
-        topic_overlap.update(unique_topics_map)
+        return coverage_diffs
+
+    def final_sentiment(self):
+        company_name = self.company_name
+        positive_count = self.sentiment_counts["Positive"]
+        negative_count = self.sentiment_counts["Negative"]
+        neutral_count = self.sentiment_counts["Neutral"]
         # Final overall sentiment analysis statement
         if positive_count > negative_count and positive_count >= neutral_count:
             if negative_count == 0:
@@ -155,11 +303,18 @@ class GeminiService:
         else:
             final_sent = f"{company_name}'s latest news coverage is mixed."
             final_sent += " There are both positive and negative aspects in the recent news."
+        return final_sent
+
+    def result(self):
+        """
+        The full report for the articles added so far.
+        """
+        result = {"Company": self.company_name, "Articles": list(self.articles)}
         # Assemble the comparative analysis results
         result["Comparative Sentiment Score"] = {
-            "Sentiment Distribution": sentiment_dist,
-            "Coverage Differences": coverage_diffs,
-            "Topic Overlap": topic_overlap
+            "Sentiment Distribution": self.sentiment_distribution(),
+            "Coverage Differences": self.coverage_differences(),
+            "Topic Overlap": self.topic_overlap()
         }
-        result["Final Sentiment Analysis"] = final_sent
+        result["Final Sentiment Analysis"] = self.final_sentiment()
         return result
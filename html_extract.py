@@ -0,0 +1,155 @@
+import codecs
+import re
+
+# BeautifulSoup is imported by the backends that use it, so the default lxml path never loads it
+try:
+    from lxml import etree
+except ImportError:  # lxml is optional; the BeautifulSoup backends still work
+    etree = None
+
+BACKENDS = ("lxml", "strainer", "html.parser")
+DEFAULT_BACKEND = "lxml" if etree is not None else "strainer"
+
+_META_CHARSET_RE = re.compile(rb'<meta[^>]+charset=["\']?([\w-]+)', re.IGNORECASE)
+# Text nodes that get_text() would return: no script/style contents (comments are never text())
+_TEXT_XPATH = './/text()[not(ancestor::script) and not(ancestor::style)]'
+
+
+def _known_encoding(name):
+    try:
+        codecs.lookup(name)
+        return True
+    except LookupError:
+        return False
+
+
+def sniff_encoding(head, declared=None):
+    """
+    Pick the encoding for an HTML body: the HTTP charset if declared, else a <meta charset>
+    in the first bytes, else UTF-8. Charsets Python does not know are ignored.
+    """
+    if declared and _known_encoding(declared):
+        return declared
+    match = _META_CHARSET_RE.search(head[:4096])
+    if match:
+        encoding = match.group(1).decode('ascii', 'replace')
+        if _known_encoding(encoding):
+            return encoding
+    return 'utf-8'
+
+
+def _decode(chunks, encoding):
+    decoder = codecs.getincrementaldecoder(encoding)(errors='replace')
+    for chunk in chunks:
+        text = decoder.decode(chunk)
+        if text:
+            yield text
+    tail = decoder.decode(b'', final=True)
+    if tail:
+        yield tail
+
+
+def _extract_soup(page_soup):
+    # Attempt to extract main article text
+    article_body = page_soup.find('article')
+    if article_body:
+        # Join text content of all sub-elements in <article> tag
+        return article_body.get_text(separator=' ')
+    # Fallback: join all paragraph texts in the page
+    paragraphs = page_soup.find_all('p')
+    return ' '.join(p.get_text() for p in paragraphs)
+
+
+def _extract_html_parser(chunks, encoding, max_chars):
+    """
+    Full BeautifulSoup tree (the original extraction path).
+    """
+    from bs4 import BeautifulSoup
+    html = ''.join(_decode(chunks, encoding))
+    return _extract_soup(BeautifulSoup(html, 'html.parser'))
+
+
+def _extract_strainer(chunks, encoding, max_chars):
+    """
+    BeautifulSoup restricted to <article> and <p> subtrees, so the rest of the page is never built.
+    """
+    from bs4 import BeautifulSoup, SoupStrainer
+    html = ''.join(_decode(chunks, encoding))
+    return _extract_soup(BeautifulSoup(html, 'html.parser', parse_only=SoupStrainer(['article', 'p'])))
+
+
+def _extract_lxml(chunks, encoding, max_chars):
+    """
+    Incremental lxml parse: the page is fed chunk by chunk and only <article>/<p> end events are
+    inspected. Paragraphs outside an <article> are cleared once read to keep the tree small, and
+    parsing stops as soon as max_chars of text has been collected.
+    """
+    parser = etree.HTMLPullParser(events=('end',), tag=('article', 'p'))
+    paragraphs = []
+    collected = 0
+    article_text = None
+    for text in _decode(chunks, encoding):
+        parser.feed(text)
+        for _, element in parser.read_events():
+            if element.tag == 'article':
+                article_text = ' '.join(element.xpath(_TEXT_XPATH))
+                break
+            paragraph = ''.join(element.xpath(_TEXT_XPATH))
+            paragraphs.append(paragraph)
+            collected += len(paragraph)
+            if not any(ancestor.tag == 'article' for ancestor in element.iterancestors()):
+                element.clear(keep_tail=True)
+        if article_text is not None or (max_chars and collected >= max_chars):
+            break
+    else:
+        try:
+            parser.close()
+        except etree.XMLSyntaxError:
+            pass
+        for _, element in parser.read_events():
+            if element.tag == 'article':
+                article_text = ' '.join(element.xpath(_TEXT_XPATH))
+                break
+            paragraphs.append(''.join(element.xpath(_TEXT_XPATH)))
+    if article_text is not None:
+        return article_text
+    return ' '.join(paragraphs)
+
+
+_EXTRACTORS = {
+    "lxml": _extract_lxml,
+    "strainer": _extract_strainer,
+    "html.parser": _extract_html_parser,
+}
+
+
+def extract_content(body, backend=None, max_chars=None, encoding=None):
+    """
+    Extract the main text of an article page: the first <article> if there is one, otherwise
+    all <p> texts joined. `body` is the page as str, bytes or an iterable of byte chunks (e.g.
+    a streamed response), decoded with `encoding` when given and known to Python. The result
+    is stripped and cut to `max_chars` when given.
+    """
+    backend = backend or DEFAULT_BACKEND
+    if backend not in _EXTRACTORS:
+        raise ValueError(f"Unknown extraction backend '{backend}' (expected one of {', '.join(BACKENDS)})")
+    if backend == "lxml" and etree is None:
+        backend = "strainer"
+    if isinstance(body, str):
+        chunks, encoding = [body.encode('utf-8')], 'utf-8'
+    elif isinstance(body, (bytes, bytearray)):
+        chunks = [bytes(body)]
+    else:
+        chunks = list(body)
+    if not encoding or not _known_encoding(encoding):
+        # No usable declared charset: fall back on the page's <meta charset>, then UTF-8
+        head = b''
+        for chunk in chunks:
+            head += chunk
+            if len(head) >= 4096:
+                break
+        encoding = sniff_encoding(head)
+    content = _EXTRACTORS[backend](chunks, encoding, max_chars).strip()
+    if max_chars:
+        content = content[:max_chars]
+    return content
@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from utils.article_cache import AnalysisCache, content_hash
+from utils.metrics import metrics
+from utils.rate_limit import TokenBucket
+
+# Gemini REST endpoint; GEMINI_API_URL points it at another server (e.g. the benchmark mock)
+GEMINI_API_URL = os.environ.get("GEMINI_API_URL", "https://generativelanguage.googleapis.com/v1beta")
+GEMINI_MODEL = os.environ.get("GEMINI_MODEL", "gemini-1.5-flash")
+# Quota and limits (per process; see GeminiLLM.from_env for splitting them across workers)
+GEMINI_RPM = float(os.environ.get("GEMINI_RPM", 60))
+GEMINI_TPM = float(os.environ.get("GEMINI_TPM", 1000000))
+GEMINI_TOKEN_BUDGET = int(os.environ["GEMINI_TOKEN_BUDGET"]) if os.environ.get("GEMINI_TOKEN_BUDGET") else None
+GEMINI_CONCURRENCY = int(os.environ.get("GEMINI_CONCURRENCY", 4))
+GEMINI_DEADLINE = float(os.environ.get("GEMINI_DEADLINE", 60))
+# Bump when the prompt or response handling changes so cached LLM results are not reused
+PROMPT_VERSION = 1
+# Rough token estimate (no tokenizer call): ~4 characters per token, plus the expected answer size
+CHARS_PER_TOKEN = 4
+OUTPUT_TOKENS_PER_ARTICLE = 200
+MAX_ARTICLE_CHARS = 6000
+MAX_TOPICS = 5
+SENTIMENTS = ("Positive", "Negative", "Neutral")
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+PROMPT = """You analyze news coverage of companies. For each article in the JSON list below, write a
+one or two sentence summary, classify the article's sentiment towards its company as Positive,
+Negative or Neutral, and list up to 5 short topics. Reply with only a JSON array holding one
+object per article: {"id": <article id>, "summary": "...", "sentiment": "...", "topics": ["..."]}.
+
+ARTICLES:
+"""
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class GeminiLLM:
+    """
+    Batched, rate-limited Gemini backend for GeminiService.
+
+    Articles (from any number of companies) are packed into as few generateContent requests as
+    fit `max_batch_tokens`, and the requests run concurrently on an asyncio loop, at most
+    `concurrency` at a time, paced by requests-per-minute and tokens-per-minute token buckets.
+    Rate-limit and server errors are retried with exponential backoff (honouring Retry-After).
+    Articles whose batch fails, would exceed `token_budget` (total tokens this backend may
+    spend) or cannot finish within `deadline` seconds come back as None, and the caller falls
+    back to the keyword heuristic for them.
+    """
+    def __init__(self, api_key, model=GEMINI_MODEL, base_url=GEMINI_API_URL, max_batch_tokens=8000,
+                 max_batch_articles=10, concurrency=GEMINI_CONCURRENCY, requests_per_minute=GEMINI_RPM,
+                 tokens_per_minute=GEMINI_TPM, token_budget=GEMINI_TOKEN_BUDGET, deadline=GEMINI_DEADLINE,
+                 max_retries=4, timeout=30):
+        self.api_key = api_key
+        self.model = model
+        self.url = f"{base_url.rstrip('/')}/models/{model}:generateContent"
+        self.max_batch_tokens = max_batch_tokens
+        self.max_batch_articles = max_batch_articles
+        self.concurrency = concurrency
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.request_bucket = TokenBucket.per_minute(requests_per_minute)
+        self.token_bucket = TokenBucket.per_minute(tokens_per_minute)
+        self.token_budget = token_budget
+        self.tokens_used = 0
+        self._budget_lock = threading.Lock()
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max(1, concurrency))
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @classmethod
+    def from_env(cls, api_key, share=1):
+        """
+        Backend configured from the GEMINI_* environment, taking 1/share of the quota and budget
+        (for one of `share` worker processes calling the API at the same time).
+        """
+        share = max(1, share)
+        return cls(api_key, requests_per_minute=GEMINI_RPM / share, tokens_per_minute=GEMINI_TPM / share,
+                   token_budget=GEMINI_TOKEN_BUDGET // share if GEMINI_TOKEN_BUDGET is not None else None)
+
+    def cache_key(self, company_name, art):
+        """
+        AnalysisCache key for an article's LLM result (separate from the heuristic results).
+        """
+        article_hash = art.get("content_hash") or content_hash(art.get("content", ""))
+        return AnalysisCache.key(f"llm:{self.model}:{PROMPT_VERSION}", company_name, art.get("title", ""), article_hash)
+
+    def make_batches(self, items):
+        """
+        Greedily pack (company, article) pairs into batches under the token and article limits.
+        Returns lists of (item_index, payload, estimated_tokens).
+        """
+        batches = []
+        batch, batch_tokens = [], estimate_tokens(PROMPT)
+        for index, (company_name, art) in enumerate(items):
+            payload = {"id": index, "company": company_name, "title": art.get("title", ""),
+                       "text": art.get("content", "")[:MAX_ARTICLE_CHARS]}
+            tokens = estimate_tokens(json.dumps(payload, ensure_ascii=False)) + OUTPUT_TOKENS_PER_ARTICLE
+            if batch and (batch_tokens + tokens > self.max_batch_tokens or len(batch) >= self.max_batch_articles):
+                batches.append(batch)
+                batch, batch_tokens = [], estimate_tokens(PROMPT)
+            batch.append((index, payload, tokens))
+            batch_tokens += tokens
+        if batch:
+            batches.append(batch)
+        return batches
+
+    def analyze(self, items):
+        """
+        Analyze (company, article) pairs. Returns a list aligned with `items` holding an article
+        result dict ('Title', 'Summary', 'Sentiment', 'Topics') or None where the caller should
+        fall back. Runs its own event loop, so call it from synchronous code.
+        """
+        items = list(items)
+        if not items:
+            return []
+        return asyncio.run(self._analyze(items))
+
+    async def _analyze(self, items):
+        results = [None] * len(items)
+        deadline_at = time.monotonic() + self.deadline if self.deadline else None
+        semaphore = asyncio.Semaphore(max(1, self.concurrency))
+        await asyncio.gather(*(self._run_batch(batch, items, results, semaphore, deadline_at)
+                               for batch in self.make_batches(items)))
+        metrics.inc("llm_articles", sum(1 for r in results if r is not None), result="llm")
+        return results
+
+    def _reserve_budget(self, tokens):
+        with self._budget_lock:
+            if self.token_budget is not None and self.tokens_used + tokens > self.token_budget:
+                return False
+            self.tokens_used += tokens
+            return True
+
+    def _settle_budget(self, estimated, actual):
+        with self._budget_lock:
+            self.tokens_used += actual - estimated
+
+    async def _run_batch(self, batch, items, results, semaphore, deadline_at):
+        estimated = estimate_tokens(PROMPT) + sum(tokens for _, _, tokens in batch)
+        if not self._reserve_budget(estimated):
+            metrics.inc("llm_articles", len(batch), result="fallback_budget")
+            return
+        prompt = PROMPT + json.dumps([payload for _, payload, _ in batch], ensure_ascii=False)
+        spent = 0
+        async with semaphore:
+            for attempt in range(self.max_retries + 1):
+                remaining = deadline_at - time.monotonic() if deadline_at is not None else None
+                if remaining is not None and remaining <= 0:
+                    break
+                if not (await self.request_bucket.acquire_async(1, max_wait=remaining)
+                        and await self.token_bucket.acquire_async(estimated, max_wait=remaining)):
+                    break
+                timeout = self.timeout
+                if deadline_at is not None:
+                    timeout = max(0.1, min(timeout, deadline_at - time.monotonic()))
+                retry_after = None
+                try:
+                    with metrics.timer("llm_request"):
+                        response = await asyncio.to_thread(self._post, prompt, timeout)
+                except requests.RequestException as e:
+                    print(f"Gemini request failed (attempt {attempt + 1}): {e}")
+                else:
+                    if response.status_code == 200:
+                        spent, parsed = self._parse(response, batch, items, estimated)
+                        metrics.inc("llm_tokens", spent)
+                        if parsed is None:
+                            break
+                        self._settle_budget(estimated, spent)
+                        for index, article_result in parsed.items():
+                            results[index] = article_result
+                        missing = len(batch) - len(parsed)
+                        if missing:
+                            metrics.inc("llm_articles", missing, result="fallback_invalid")
+                        return
+                    print(f"Gemini request failed (attempt {attempt + 1}): HTTP {response.status_code}")
+                    if response.status_code not in RETRY_STATUS:
+                        break
+                    retry_after = response.headers.get("Retry-After")
+                if attempt == self.max_retries:
+                    break
+                metrics.inc("llm_retries")
+                try:
+                    delay = float(retry_after)
+                except (TypeError, ValueError):
+                    delay = min(30.0, 2 ** attempt) * (0.5 + random.random() / 2)
+                if deadline_at is not None and time.monotonic() + delay >= deadline_at:
+                    break
+                await asyncio.sleep(delay)
+        self._settle_budget(estimated, spent)
+        reason = "deadline" if deadline_at is not None and time.monotonic() >= deadline_at else "error"
+        metrics.inc("llm_articles", len(batch), result=f"fallback_{reason}")
+
+    def _post(self, prompt, timeout):
+        body = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"temperature": 0, "responseMimeType": "application/json"},
+        }
+        return self.session.post(self.url, json=body, timeout=timeout,
+                                 headers={"x-goog-api-key": self.api_key})
+
+    def _parse(self, response, batch, items, estimated):
+        """
+        Read a generateContent response. Returns (tokens_spent, {item_index: article_result})
+        with invalid entries left out, or (tokens_spent, None) if the answer is unreadable.
+        """
+        spent = estimated
+        try:
+            data = response.json()
+            spent = data.get("usageMetadata", {}).get("totalTokenCount") or estimated
+            text = "".join(part.get("text", "") for part in data["candidates"][0]["content"]["parts"])
+            answers = json.loads(text)
+        except (ValueError, KeyError, IndexError, TypeError, AttributeError) as e:
+            print(f"Unreadable Gemini response: {e}")
+            return spent, None
+        wanted = {index for index, _, _ in batch}
+        parsed = {}
+        for answer in answers if isinstance(answers, list) else []:
+            if not isinstance(answer, dict):
+                continue
+            try:
+                index = int(answer.get("id"))
+            except (TypeError, ValueError):
+                continue
+            sentiment = str(answer.get("sentiment", "")).strip().capitalize()
+            topics = answer.get("topics") or []
+            if index not in wanted or sentiment not in SENTIMENTS or not isinstance(topics, list):
+                continue
+            parsed[index] = {
+                "Title": items[index][1].get("title", ""),
+                "Summary": str(answer.get("summary", "")).strip(),
+                "Sentiment": sentiment,
+                "Topics": list(dict.fromkeys(str(t) for t in topics if t))[:MAX_TOPICS],
+            }
+        return spent, parsed
@@ -0,0 +1,244 @@
+import atexit
+import cProfile
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key):
+    if not key:
+        return ""
+    parts = []
+    for name, value in key:
+        value = str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        parts.append(f'{name}="{value}"')
+    return "{" + ",".join(parts) + "}"
+
+
+class Metrics:
+    """
+    In-process counters, gauges and timers, cheap enough to leave on in production: a timer costs
+    two perf_counter calls and one short lock. Timers keep count/sum/max per label set. Hooks (e.g. a
+    profiler or a slow-call logger) are called with (name, seconds, labels) for every timing.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}  # name -> {label_key: value}
+        self._timers = {}    # name -> {label_key: [count, total, max]}
+        self._gauges = {}    # name -> {label_key: value}
+        self._help = {}
+        self.hooks = []
+
+    def describe(self, name, text):
+        self._help[name] = text
+
+    def inc(self, name, value=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._counters.setdefault(name, {})
+            series[key] = series.get(key, 0) + value
+
+    def set(self, name, value, **labels):
+        """
+        Set a gauge (a value that goes up and down, e.g. a queue depth).
+        """
+        key = _label_key(labels)
+        with self._lock:
+            self._gauges.setdefault(name, {})[key] = value
+
+    def observe(self, name, seconds, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._timers.setdefault(name, {})
+            stat = series.get(key)
+            if stat is None:
+                series[key] = [1, seconds, seconds]
+            else:
+                stat[0] += 1
+                stat[1] += seconds
+                if seconds > stat[2]:
+                    stat[2] = seconds
+        for hook in self.hooks:
+            hook(name, seconds, labels)
+
+    @contextmanager
+    def timer(self, name, **labels):
+        """
+        Time a block: `with metrics.timer("rss_fetch"): ...`. Failed blocks are timed too and
+        also counted in <name>_errors.
+        """
+        profiler = _section_profiler
+        if profiler is not None and profiler.wants(name):
+            with profiler.profile(name):
+                with self._timed(name, labels):
+                    yield
+        else:
+            with self._timed(name, labels):
+                yield
+
+    @contextmanager
+    def _timed(self, name, labels):
+        start = time.perf_counter()
+        try:
+            yield
+        except BaseException:
+            self.inc(f"{name}_errors", **labels)
+            raise
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def total(self, name):
+        """
+        Sum of a counter across all its label sets (0 if it was never incremented).
+        """
+        with self._lock:
+            return sum(self._counters.get(name, {}).values())
+
+    def snapshot(self):
+        """
+        Plain-dict copy of every metric (for JSON stats files).
+        """
+        with self._lock:
+            counters = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                        for name, series in self._counters.items()}
+            timers = {name: [{"labels": dict(key), "count": s[0], "sum_seconds": s[1], "max_seconds": s[2]}
+                             for key, s in series.items()]
+                      for name, series in self._timers.items()}
+            gauges = {name: [{"labels": dict(key), "value": value} for key, value in series.items()]
+                      for name, series in self._gauges.items()}
+        return {"counters": counters, "timers": timers, "gauges": gauges}
+
+    def render_prometheus(self, prefix="news_"):
+        """
+        Render all metrics in the Prometheus text exposition format.
+        """
+        lines = []
+        with self._lock:
+            for name, series in sorted(self._counters.items()):
+                metric = f"{prefix}{name}_total"
+                if name in self._help:
+                    lines.append(f"# HELP {metric} {self._help[name]}")
+                lines.append(f"# TYPE {metric} counter")
+                for key, value in series.items():
+                    lines.append(f"{metric}{_format_labels(key)} {value}")
+            for name, series in sorted(self._timers.items()):
+                metric = f"{prefix}{name}_seconds"
+                if name in self._help:
+                    lines.append(f"# HELP {metric} {self._help[name]}")
+                lines.append(f"# TYPE {metric} summary")
+                for key, (count, total, _) in series.items():
+                    labels = _format_labels(key)
+                    lines.append(f"{metric}_count{labels} {count}")
+                    lines.append(f"{metric}_sum{labels} {total:.6f}")
+                lines.append(f"# TYPE {metric}_max gauge")
+                for key, (_, _, maximum) in series.items():
+                    lines.append(f"{metric}_max{_format_labels(key)} {maximum:.6f}")
+            for name, series in sorted(self._gauges.items()):
+                metric = f"{prefix}{name}"
+                if name in self._help:
+                    lines.append(f"# HELP {metric} {self._help[name]}")
+                lines.append(f"# TYPE {metric} gauge")
+                for key, value in series.items():
+                    lines.append(f"{metric}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._timers.clear()
+            self._gauges.clear()
+
+
+class SectionProfiler:
+    """
+    Optional cProfile of selected timed sections, merged across threads and dumped at exit.
+    Enabled with NEWS_PROFILE=<comma-separated metric names, or *> and written to
+    NEWS_PROFILE_OUT (default news_profile.pstats); inspect with `python -m pstats`.
+    """
+    def __init__(self, names, output_path):
+        self.names = set(names)
+        self.output_path = output_path
+        self._lock = threading.Lock()
+        self._stats = None
+
+    def wants(self, name):
+        return "*" in self.names or name in self.names
+
+    @contextmanager
+    def profile(self, name):
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            with self._lock:
+                if self._stats is None:
+                    self._stats = pstats.Stats(profiler)
+                else:
+                    self._stats.add(profiler)
+
+    def dump(self):
+        with self._lock:
+            if self._stats is not None:
+                self._stats.dump_stats(self.output_path)
+
+
+_section_profiler = None
+if os.environ.get("NEWS_PROFILE"):
+    _section_profiler = SectionProfiler(os.environ["NEWS_PROFILE"].split(","),
+                                        os.environ.get("NEWS_PROFILE_OUT", "news_profile.pstats"))
+    atexit.register(_section_profiler.dump)
+
+# Process-wide registry used by the scraper, analysis, store, TTS, API and cron
+metrics = Metrics()
+metrics.describe("rss_fetch", "Google News RSS download and parse.")
+metrics.describe("article_fetch", "Article page download (including waits for the per-host limit).")
+metrics.describe("html_parse", "Article text extraction.")
+metrics.describe("analyze_articles", "GeminiService.analyze_articles in this process.")
+metrics.describe("store_write", "Report store writes.")
+metrics.describe("store_read", "Report store reads.")
+metrics.describe("tts_translate", "Hindi translation calls (cache misses only).")
+metrics.describe("tts_synthesize", "gTTS synthesis calls.")
+metrics.describe("http_request", "API handler time by route.")
+metrics.describe("dedup_fetches_saved", "Article downloads skipped because the headline repeated an earlier story.")
+metrics.describe("dedup_analyses_saved", "Articles not analyzed because they repeated an earlier story.")
+metrics.describe("cron_stage", "cron pipeline stage time per company (analysis may run in worker processes).")
+metrics.describe("work_queue", "Work queue operations (cron --worker) by operation.")
+metrics.describe("work_leases", "Work queue leases: claimed, taken over from an expired lease, or lost.")
+metrics.describe("scheduler_queue_depth", "Companies past their refresh due time and not yet being refreshed.")
+metrics.describe("scheduler_in_flight", "Companies being refreshed.")
+metrics.describe("scheduler_freshness_lag_seconds", "How far past their due time overdue companies are.")
+
+
+def serve_metrics(port, host="0.0.0.0", registry=metrics):
+    """
+    Serve the registry in the Prometheus text format at http://host:port/metrics from a daemon
+    thread, for long-running processes without an API (the cron refresh daemon). Returns the server.
+    """
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?", 1)[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
@@ -1,27 +1,127 @@
-import requests
-from bs4 import BeautifulSoup
-from urllib.parse import quote_plus
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from urllib.parse import quote_plus, urlparse
 
-def scrape_news(company, num_articles=10):
+from utils.article_cache import content_hash
+from utils.dedup import Deduplicator
+from utils.metrics import metrics
+
+# requests, BeautifulSoup and the HTML extractors are imported on first use, so importing this
+# module (api.py does at startup) does not pay for them
+
+HEADERS = {"User-Agent": "Mozilla/5.0"}  # set a user-agent to mimic a browser
+REQUEST_TIMEOUT = 10
+# Feed URL template; NEWS_RSS_URL points scraping at another server (e.g. the benchmark stand-in)
+RSS_URL = os.environ.get("NEWS_RSS_URL", "https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en")
+# Article extraction: parser backend ("lxml", "strainer" or "html.parser"), download cap and text cap
+EXTRACT_BACKEND = os.environ.get("NEWS_EXTRACT_BACKEND") or None
+MAX_PAGE_BYTES = 2 * 1024 * 1024
+MAX_CONTENT_CHARS = 50000
+CHUNK_SIZE = 64 * 1024
+# Connections kept alive per host: cron's total download concurrency (8 scrape workers times 10
+# downloads each), so connections to a busy host are reused instead of discarded
+POOL_SIZE = int(os.environ.get("NEWS_POOL_SIZE", 80))
+# Article downloads in flight per host, across every scrape in the process. Most Google News
+# article links share the host news.google.com, so this is sized like the pool: it bounds the
+# process as a whole (cron plus any other scrapes) without throttling cron's own pipeline
+PER_HOST_LIMIT = int(os.environ.get("NEWS_PER_HOST_LIMIT", POOL_SIZE))
+
+# Shared, pooled HTTP session and per-host limiter (created lazily, reused by every scrape)
+_session = None
+_session_lock = threading.Lock()
+_host_limiter = None
+
+
+def get_session(pool_size=POOL_SIZE):
     """
-    Search Google News for the given company and scrape content from news articles.
-    Returns a list of dicts with 'title' and 'content' for each article.
+    Return the shared requests.Session used for feed and article downloads.
+    The session keeps connections alive so repeated hits to the same host skip the TCP/TLS handshake.
     """
-    query = quote_plus(company)
-    url = f"https://news.google.com/rss/search?q={query}&hl=en-US&gl=US&ceid=US:en"
-    headers = {"User-Agent": "Mozilla/5.0"}  # set a user-agent to mimic a browser
-    try:
-        response = requests.get(url, headers=headers, timeout=10)
-        response.raise_for_status()
-    except Exception as e:
-        print(f"Error fetching news feed for '{company}': {e}")
-        return []
-    soup = BeautifulSoup(response.text, 'xml')
-    items = soup.find_all('item')
-    articles = []
-    for item in items:
-        if len(articles) >= num_articles:
-            break
+    global _session
+    with _session_lock:
+        if _session is None:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=32, pool_maxsize=pool_size)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            session.headers.update(HEADERS)
+            _session = session
+    return _session
+
+
+class _HostLimiter:
+    """
+    Caps the number of in-flight requests per host so one slow site cannot hog the pool.
+    """
+    def __init__(self, per_host):
+        self.per_host = per_host
+        self._lock = threading.Lock()
+        self._semaphores = {}
+
+    def get(self, url):
+        host = urlparse(url).netloc
+        with self._lock:
+            sem = self._semaphores.get(host)
+            if sem is None:
+                sem = threading.BoundedSemaphore(self.per_host)
+                self._semaphores[host] = sem
+        return sem
+
+
+class _SlotWaits:
+    """
+    Tracks how long a scrape had fetches waiting for a host slot (time during which at least
+    one was waiting), so the scrape deadline can leave that time out.
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._since = None
+        self._waited = 0.0
+
+    def acquire(self, slot):
+        with self._lock:
+            if self._waiting == 0:
+                self._since = time.monotonic()
+            self._waiting += 1
+        try:
+            slot.acquire()
+        finally:
+            with self._lock:
+                self._waiting -= 1
+                if self._waiting == 0:
+                    self._waited += time.monotonic() - self._since
+
+    def seconds(self):
+        with self._lock:
+            return self._waited + (time.monotonic() - self._since if self._waiting else 0.0)
+
+
+def get_host_limiter():
+    """
+    Return the _HostLimiter shared by every scrape in the process (PER_HOST_LIMIT per host).
+    """
+    global _host_limiter
+    with _session_lock:
+        if _host_limiter is None:
+            _host_limiter = _HostLimiter(PER_HOST_LIMIT)
+    return _host_limiter
+
+
+def _parse_feed(xml_text):
+    """
+    Parse the Google News RSS feed and return (title, link) pairs in feed order.
+    """
+    from bs4 import BeautifulSoup
+    soup = BeautifulSoup(xml_text, 'xml')
+    entries = []
+    for item in soup.find_all('item'):
         # Parse title and source from the RSS feed item
         title_tag = item.find('title')
         source_tag = item.find('source')
@@ -35,26 +135,305 @@ def scrape_news(company, num_articles=10):
         link = link_tag.text if link_tag else None
         if not link:
             continue
-        # Fetch the article webpage
-        try:
-            article_resp = requests.get(link, headers=headers, timeout=10)
+        entries.append((title, link))
+    return entries
+
+
+def _read_body(response, max_bytes):
+    """
+    Read a streamed response in chunks, stopping at max_bytes. Returns (chunks, body_hash).
+    """
+    chunks = []
+    digest = hashlib.sha256()
+    size = 0
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        if not chunk:
+            continue
+        if max_bytes and size + len(chunk) > max_bytes:
+            chunk = chunk[:max_bytes - size]
+        chunks.append(chunk)
+        digest.update(chunk)
+        size += len(chunk)
+        if max_bytes and size >= max_bytes:
+            break
+    return chunks, digest.hexdigest()
+
+
+def _declared_charset(response):
+    content_type = response.headers.get("Content-Type", "")
+    if "charset=" in content_type:
+        return content_type.split("charset=", 1)[1].split(";")[0].strip().strip('"\'') or None
+    return None
+
+
+def _fetch_article(session, limiter, link, timeout, cache=None, budget=None, deadline_at=None, slot_waits=None):
+    """
+    Download and extract one article. Returns (content, content_hash), or None if it should be skipped.
+    The body is streamed and capped at MAX_PAGE_BYTES. With a cache, the page is revalidated with a
+    conditional request and unchanged pages (304, or an identical body) reuse the cached extraction
+    instead of being parsed again. With a RequestBudget, the download waits for its share of the
+    budget and is skipped if that share would only come after `deadline_at`. The download waits
+    for a free slot of its host (recorded in `slot_waits`, a _SlotWaits) however long that takes.
+    """
+    if budget is not None:
+        max_wait = deadline_at - time.monotonic() if deadline_at is not None else None
+        if not budget.acquire(link, max_wait=max_wait):
+            metrics.inc("articles", result="over_budget")
+            return None
+    entry = cache.get(link) if cache else None
+    headers = cache.conditional_headers(entry) if cache else {}
+    host_slot = limiter.get(link)
+    if slot_waits is not None:
+        slot_waits.acquire(host_slot)
+    else:
+        host_slot.acquire()
+    try:
+        with metrics.timer("article_fetch"), \
+                session.get(link, headers=headers, timeout=timeout, stream=True) as article_resp:
+            if article_resp.status_code == 304 and entry:
+                metrics.inc("articles", result="not_modified")
+                return entry["content"], entry["content_hash"]
             article_resp.raise_for_status()
+            chunks, body_hash = _read_body(article_resp, MAX_PAGE_BYTES)
+    except Exception as e:
+        print(f"Skipping article (fetch error): {e}")
+        metrics.inc("articles", result="fetch_error")
+        return None
+    finally:
+        host_slot.release()
+    if entry and entry.get("body_hash") == body_hash:
+        metrics.inc("articles", result="unchanged")
+        content = entry["content"]
+    else:
+        from utils.html_extract import DEFAULT_BACKEND, extract_content
+        backend = EXTRACT_BACKEND or DEFAULT_BACKEND
+        try:
+            with metrics.timer("html_parse", backend=backend):
+                content = extract_content(chunks, backend=backend, max_chars=MAX_CONTENT_CHARS,
+                                          encoding=_declared_charset(article_resp))
         except Exception as e:
-            print(f"Skipping article (fetch error): {e}")
-            continue
-        page_soup = BeautifulSoup(article_resp.text, 'html.parser')
-        # Attempt to extract main article text
-        content = ""
-        article_body = page_soup.find('article')
-        if article_body:
-            # Join text content of all sub-elements in <article> tag
-            content = article_body.get_text(separator=' ')
-        else:
-            # Fallback: join all paragraph texts in the page
-            paragraphs = page_soup.find_all('p')
-            content = ' '.join(p.get_text() for p in paragraphs)
-        content = content.strip()
-        if not content:
-            continue
-        articles.append({"title": title, "content": content})
-    return articles
+            print(f"Skipping article (extraction error): {e}")
+            metrics.inc("articles", result="parse_error")
+            return None
+        metrics.inc("articles", result="parsed" if content else "empty")
+    if not content:
+        return None
+    if cache is None:
+        return content, content_hash(content)
+    try:
+        entry = cache.store(link, content, body_hash=body_hash,
+                            etag=article_resp.headers.get("ETag"),
+                            last_modified=article_resp.headers.get("Last-Modified"))
+    except OSError as e:
+        print(f"Could not cache article {link}: {e}")
+        return content, content_hash(content)
+    return content, entry["content_hash"]
+
+
+def poll_feed(company, cache=None, budget=None, store=True):
+    """
+    Fetch the Google News RSS feed for a company, conditionally when a cache (an ArticleCache,
+    keyed by feed URL) holds the previous poll. Returns (entries, previous_entries, validators):
+    the current (title, link) pairs, or None on error, the pairs seen at the previous poll (None
+    without a cache or on the first poll), and the response's {"etag", "last_modified"} (None on
+    a 304 or an error). A 304 answer returns the previous entries as current.
+
+    With store=False the new entries are not written to the cache; the caller saves them with
+    save_feed once it has processed them, so a poll whose stories were not handled is repeated.
+    """
+    session = get_session()
+    url = RSS_URL.format(query=quote_plus(company))
+    cached = cache.get(url) if cache else None
+    previous = [tuple(entry) for entry in json.loads(cached["content"])] if cached else None
+    if budget is not None:
+        budget.acquire(url)
+    with metrics.timer("rss_fetch"):
+        try:
+            response = session.get(url, timeout=REQUEST_TIMEOUT,
+                                   headers=cache.conditional_headers(cached) if cache else None)
+            if response.status_code == 304 and previous is not None:
+                metrics.inc("rss_not_modified")
+                return previous, previous, None
+            response.raise_for_status()
+        except Exception as e:
+            print(f"Error fetching news feed for '{company}': {e}")
+            metrics.inc("rss_fetch_errors")
+            return None, previous, None
+        entries = _parse_feed(response.text)
+    validators = {"etag": response.headers.get("ETag"), "last_modified": response.headers.get("Last-Modified")}
+    if cache and store:
+        save_feed(company, entries, cache, **validators)
+    return entries, previous, validators
+
+
+def save_feed(company, entries, cache, etag=None, last_modified=None):
+    """
+    Store a company's polled feed entries and their validators for the next conditional poll.
+    """
+    try:
+        cache.store(RSS_URL.format(query=quote_plus(company)), json.dumps(entries, ensure_ascii=False),
+                    etag=etag, last_modified=last_modified)
+    except OSError as e:
+        print(f"Could not cache news feed for '{company}': {e}")
+
+
+def fetch_feed(company):
+    """
+    Fetch the Google News RSS feed for a company. Returns (title, link) pairs, or None on error.
+    """
+    return poll_feed(company)[0]
+
+
+def _fetch_entries(company, entries, num_articles, max_workers, per_host_limit, deadline, cache,
+                   dedup=None, progress=None, budget=None):
+    """
+    Fetch feed entries concurrently, yielding (feed_index, (content, content_hash)) as each
+    article succeeds. At most `num_articles` are yielded: only that many fetches are started
+    up front and failures are refilled from the next feed items, so the submitted items always
+    form a prefix of the feed. With a Deduplicator, articles whose text nearly copies one already
+    yielded count as failures (and are refilled). The number of entries submitted is left in
+    progress["submitted"].
+    """
+    if not entries or num_articles <= 0:
+        return
+    session = get_session()
+    limiter = get_host_limiter() if per_host_limit is None else _HostLimiter(per_host_limit)
+    deadline_at = time.monotonic() + deadline if deadline else None
+    slot_waits = _SlotWaits()
+    found = 0
+    pending = {}   # future -> feed index
+    next_index = 0
+    executor = ThreadPoolExecutor(max_workers=max(1, max_workers))
+    try:
+        def submit_next():
+            nonlocal next_index
+            link = entries[next_index][1]
+            future = executor.submit(_fetch_article, session, limiter, link, REQUEST_TIMEOUT, cache,
+                                     budget, deadline_at, slot_waits)
+            pending[future] = next_index
+            next_index += 1
+
+        while next_index < len(entries) and len(pending) < num_articles:
+            submit_next()
+        while pending:
+            timeout = None
+            if deadline_at is not None:
+                # Time spent waiting for host slots (held by other scrapes) does not count
+                timeout = deadline_at + slot_waits.seconds() - time.monotonic()
+                if timeout <= 0:
+                    print(f"Deadline reached for '{company}', dropping {len(pending)} pending article(s).")
+                    break
+            done, _ = wait(pending, timeout=timeout, return_when=FIRST_COMPLETED)
+            for future in done:
+                idx = pending.pop(future)
+                fetched = future.result()
+                if fetched and dedup is not None and dedup.is_duplicate(fetched[0]):
+                    metrics.inc("dedup_analyses_saved")
+                    fetched = None
+                if fetched:
+                    found += 1
+                    yield idx, fetched
+                elif next_index < len(entries) and found + len(pending) < num_articles:
+                    submit_next()
+    finally:
+        # Don't wait for stragglers past the deadline (or an abandoned stream); their results are discarded
+        for future in pending:
+            future.cancel()
+        executor.shutdown(wait=False)
+        if progress is not None:
+            progress["submitted"] = next_index
+
+
+def _make_dedup(dedup):
+    if dedup is True:
+        return Deduplicator()
+    return dedup or None
+
+
+def _unique_entries(entries, dedup):
+    """
+    Drop headline duplicates before anything is fetched. Returns (kept_entries, dropped_positions).
+    """
+    if dedup is None:
+        return entries, []
+    return dedup.filter_titles(entries)
+
+
+def _count_saved_fetches(entries, dropped, progress, num_articles):
+    """
+    Count the headline duplicates that a scrape without dedup would have downloaded and analyzed:
+    those before the last entry fetched, and in any case those among the first `num_articles`.
+    """
+    submitted = progress.get("submitted", 0)
+    if not dropped:
+        return
+    dropped_set = set(dropped)
+    kept_positions = [position for position in range(len(entries)) if position not in dropped_set]
+    reach = kept_positions[submitted - 1] + 1 if submitted else 0
+    reach = max(reach, min(num_articles, len(entries)))
+    saved = sum(1 for position in dropped if position < reach)
+    metrics.inc("dedup_fetches_saved", saved)
+    metrics.inc("dedup_analyses_saved", saved)
+
+
+def _make_article(entry, fetched):
+    title, link = entry
+    content, article_hash = fetched
+    return {"title": title, "content": content, "link": link, "content_hash": article_hash}
+
+
+def iter_news(company, num_articles=10, max_workers=10, per_host_limit=None, deadline=30, cache=None,
+              dedup=True):
+    """
+    Streaming variant of scrape_news: yields each article dict as soon as it has been fetched
+    (completion order, not RSS order). Closing the generator cancels outstanding fetches.
+    """
+    entries = fetch_feed(company)
+    if not entries:
+        return
+    dedup = _make_dedup(dedup)
+    unique, dropped = _unique_entries(entries, dedup)
+    progress = {}
+    fetches = _fetch_entries(company, unique, num_articles, max_workers, per_host_limit, deadline, cache,
+                             dedup, progress)
+    try:
+        for idx, fetched in fetches:
+            yield _make_article(unique[idx], fetched)
+    finally:
+        fetches.close()
+        _count_saved_fetches(entries, dropped, progress, num_articles)
+
+
+def scrape_news(company, num_articles=10, max_workers=10, per_host_limit=None, deadline=30, cache=None,
+                dedup=True, entries=None, budget=None):
+    """
+    Search Google News for the given company and scrape content from news articles.
+    Returns a list of dicts with 'title', 'content', 'link' and 'content_hash' for each article.
+
+    Articles are fetched concurrently on a shared connection pool (at most `max_workers`
+    downloads in flight). Downloads per host are capped across all scrapes in the process at
+    PER_HOST_LIMIT (an explicit `per_host_limit` caps this scrape on its own instead); a download
+    waits for a free slot rather than being dropped. The result keeps RSS order and contains the
+    first `num_articles` feed items that could be fetched; failed items are replaced by the next
+    ones in the feed. Anything still pending after `deadline` seconds (not counting time spent
+    waiting for host slots) is dropped. Pass max_workers=1 for the old one-at-a-time behaviour.
+
+    `cache` is an optional ArticleCache; cached pages are fetched with conditional requests.
+    `dedup` (on by default, or a configured utils.dedup.Deduplicator) skips feed items whose
+    headline repeats an earlier one before fetching, and drops articles whose text is a near
+    copy of one already kept; both are replaced by the next feed items, so the result still
+    holds up to `num_articles` distinct stories.
+    `entries` are already fetched feed items (skips the feed download), and `budget` is an
+    optional utils.rate_limit.RequestBudget that article downloads must fit.
+    """
+    if entries is None:
+        entries = fetch_feed(company)
+    if not entries:
+        return []
+    dedup = _make_dedup(dedup)
+    unique, dropped = _unique_entries(entries, dedup)
+    progress = {}
+    fetched = sorted(_fetch_entries(company, unique, num_articles, max_workers, per_host_limit,
+                                    deadline, cache, dedup, progress, budget))
+    _count_saved_fetches(entries, dropped, progress, num_articles)
+    return [_make_article(unique[idx], result) for idx, result in fetched]
@@ -0,0 +1,122 @@
+import asyncio
+import os
+import threading
+import time
+from urllib.parse import urlparse
+
+# Crawl budget for the refresh daemon: requests per minute overall and to any one host (0 = no limit)
+CRAWL_RPM = float(os.environ.get("CRAWL_RPM", 600))
+CRAWL_HOST_RPM = float(os.environ.get("CRAWL_HOST_RPM", 120))
+
+
+class TokenBucket:
+    """
+    Token-bucket rate limiter: `rate` tokens per second, bursts of up to `capacity`.
+    Callers reserve tokens up front (the balance may go negative) and then wait until the
+    reservation is covered, so waiters are served in arrival order and never spin. Safe to share
+    between threads and event loops.
+    """
+    def __init__(self, rate, capacity=None, clock=time.monotonic):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self.clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def per_minute(cls, amount, burst=None):
+        return cls(amount / 60.0, capacity=burst if burst is not None else amount)
+
+    def reserve(self, amount=1, max_wait=None):
+        """
+        Take `amount` tokens and return how many seconds the caller must wait before using them.
+        Requests larger than the capacity are allowed but wait for the full amount. If the wait
+        would exceed max_wait, nothing is taken and None is returned.
+        """
+        with self._lock:
+            now = self.clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            wait = max(0.0, (amount - self._tokens) / self.rate)
+            if max_wait is not None and wait > max_wait:
+                return None
+            self._tokens -= amount
+            return wait
+
+    def release(self, amount=1):
+        """
+        Give back tokens from a reservation that was not used.
+        """
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens + amount)
+
+    def acquire(self, amount=1, max_wait=None):
+        """
+        Block until `amount` tokens are available. Returns False (taking nothing) if that would
+        take longer than max_wait.
+        """
+        wait = self.reserve(amount, max_wait)
+        if wait is None:
+            return False
+        if wait:
+            time.sleep(wait)
+        return True
+
+    async def acquire_async(self, amount=1, max_wait=None):
+        """
+        Async version of acquire().
+        """
+        wait = self.reserve(amount, max_wait)
+        if wait is None:
+            return False
+        if wait:
+            await asyncio.sleep(wait)
+        return True
+
+
+class RequestBudget:
+    """
+    Request budget shared by every fetch in a process: at most `per_minute` requests overall and
+    `per_host_per_minute` to any single host (either may be None for no limit). A request waits
+    for both; if one cannot be granted within max_wait, nothing is taken from the other.
+    """
+    def __init__(self, per_minute=None, per_host_per_minute=None):
+        self.total = TokenBucket.per_minute(per_minute) if per_minute else None
+        self.per_host_per_minute = per_host_per_minute
+        self._hosts = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls):
+        return cls(CRAWL_RPM or None, CRAWL_HOST_RPM or None)
+
+    def _host_bucket(self, host):
+        with self._lock:
+            bucket = self._hosts.get(host)
+            if bucket is None:
+                bucket = self._hosts[host] = TokenBucket.per_minute(self.per_host_per_minute)
+            return bucket
+
+    def acquire(self, url, max_wait=None):
+        """
+        Block until one request to `url` fits the budget. Returns False (taking nothing) if that
+        would take longer than max_wait.
+        """
+        buckets = [self.total] if self.total else []
+        if self.per_host_per_minute:
+            buckets.append(self._host_bucket(urlparse(url).netloc))
+        waits = []
+        for bucket in buckets:
+            wait = bucket.reserve(1, max_wait)
+            if wait is None:
+                for taken in buckets[:len(waits)]:
+                    taken.release(1)
+                return False
+            waits.append(wait)
+        delay = max(waits, default=0)
+        if delay:
+            time.sleep(delay)
+        return True
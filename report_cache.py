@@ -0,0 +1,104 @@
+import hashlib
+import threading
+from collections import OrderedDict
+
+from utils.metrics import metrics
+from utils.report_store import company_key
+
+
+def make_etag(body):
+    return '"' + hashlib.sha1(body).hexdigest() + '"'
+
+
+def etag_matches(if_none_match, etag):
+    """
+    Check an If-None-Match header value against an ETag (handles lists, weak tags and '*').
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == "*" or candidate == etag:
+            return True
+    return False
+
+
+class ReportCache:
+    """
+    Bounded LRU cache of pre-serialized report JSON, keyed by company.
+    Each entry remembers the run id it was built from; when cron stores a newer run, the
+    next request reloads it, so a cache hit costs a single indexed lookup of the latest run id.
+    """
+    def __init__(self, store, max_entries=512):
+        self.store = store
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, company):
+        """
+        Return (body_bytes, etag) for the latest report of `company`.
+        Raises KeyError if the company has no report.
+        """
+        key = company_key(company)
+        run_id = self.store.latest_run_id(company)
+        if run_id is None:
+            raise KeyError(company)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == run_id:
+                self._entries.move_to_end(key)
+                metrics.inc("report_cache", result="hit")
+                return entry[1], entry[2]
+        metrics.inc("report_cache", result="miss")
+        body = self.store.report_json(run_id).encode("utf-8")
+        etag = make_etag(body)
+        if self.max_entries > 0:
+            with self._lock:
+                self._entries[key] = (run_id, body, etag)
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return body, etag
+
+    def get_many(self, companies):
+        """
+        Return {company: (body_bytes, etag)} for every given company that has a report, using
+        one run-id lookup for all of them and one store read for the reports not cached yet.
+        """
+        run_ids = self.store.latest_run_ids(companies)
+        found = {}
+        missing = {}  # company -> (key, run_id)
+        with self._lock:
+            for company in companies:
+                key = company_key(company)
+                run_id = run_ids.get(key)
+                if run_id is None:
+                    continue
+                entry = self._entries.get(key)
+                if entry is not None and entry[0] == run_id:
+                    self._entries.move_to_end(key)
+                    found[company] = entry[1], entry[2]
+                else:
+                    missing[company] = key, run_id
+        metrics.inc("report_cache", len(found), result="hit")
+        if not missing:
+            return found
+        metrics.inc("report_cache", len(missing), result="miss")
+        reports = self.store.report_jsons(set(run_id for _, run_id in missing.values()))
+        with self._lock:
+            for company, (key, run_id) in missing.items():
+                report = reports.get(run_id)
+                if report is None:
+                    continue
+                body = report.encode("utf-8")
+                etag = make_etag(body)
+                found[company] = body, etag
+                if self.max_entries > 0:
+                    self._entries[key] = (run_id, body, etag)
+                    self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return found
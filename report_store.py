@@ -0,0 +1,407 @@
+import json
+import os
+import pickle
+import re
+import sqlite3
+import threading
+import time
+
+from utils.metrics import metrics
+
+DB_PATH = os.path.join('data', 'reports.db')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    company_key TEXT NOT NULL,
+    company TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    final_sentiment TEXT,
+    report_json TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_company_time ON runs (company_key, created_at);
+CREATE TABLE IF NOT EXISTS articles (
+    run_id INTEGER NOT NULL REFERENCES runs (id),
+    position INTEGER NOT NULL,
+    company_key TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    title TEXT,
+    summary TEXT,
+    sentiment TEXT,
+    topics_json TEXT,
+    PRIMARY KEY (run_id, position)
+);
+CREATE INDEX IF NOT EXISTS articles_company_time ON articles (company_key, created_at);
+CREATE TABLE IF NOT EXISTS latest (
+    company_key TEXT PRIMARY KEY,
+    company TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    positive INTEGER NOT NULL,
+    negative INTEGER NOT NULL,
+    neutral INTEGER NOT NULL,
+    final_sentiment TEXT
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS topic_postings (
+    topic_key TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    company_key TEXT NOT NULL,
+    company TEXT NOT NULL,
+    run_id INTEGER NOT NULL,
+    position INTEGER NOT NULL,
+    title TEXT,
+    sentiment TEXT,
+    created_at REAL NOT NULL,
+    PRIMARY KEY (topic_key, company_key, position)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS topic_postings_company ON topic_postings (company_key);
+CREATE INDEX IF NOT EXISTS topic_postings_time ON topic_postings (created_at, topic_key, company_key, sentiment);
+CREATE TABLE IF NOT EXISTS company_hits (
+    company_key TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    hits INTEGER NOT NULL,
+    PRIMARY KEY (company_key, hour)
+) WITHOUT ROWID;
+"""
+
+# Rebuilds the latest-run index for companies that have runs but no index row (stores created
+# before the index existed)
+BACKFILL_LATEST = """
+INSERT INTO latest (company_key, company, run_id, created_at, positive, negative, neutral, final_sentiment)
+SELECT company_key, company, id, created_at, positive, negative, neutral, final_sentiment FROM runs r
+WHERE company_key NOT IN (SELECT company_key FROM latest)
+  AND id = (SELECT id FROM runs WHERE company_key = r.company_key ORDER BY created_at DESC, id DESC LIMIT 1)
+"""
+
+# Builds topic postings from the stored articles of latest runs that have none yet
+BACKFILL_TOPICS = """
+INSERT OR IGNORE INTO topic_postings
+    (topic_key, topic, company_key, company, run_id, position, title, sentiment, created_at)
+SELECT lower(trim(t.value)), trim(t.value), l.company_key, l.company, l.run_id, a.position, a.title,
+       a.sentiment, l.created_at
+FROM latest l JOIN articles a ON a.run_id = l.run_id, json_each(a.topics_json) t
+WHERE l.company_key NOT IN (SELECT company_key FROM topic_postings) AND trim(t.value) != ''
+"""
+
+# Hourly API request counts older than this are dropped
+HITS_RETENTION_HOURS = 7 * 24
+
+# SQLite's default cap on bound parameters is 999 on older builds
+_IN_CHUNK = 500
+
+
+def company_key(company_name):
+    """
+    Normalized company identifier (same scheme as the old per-company file names).
+    """
+    return re.sub(r'\W+', '_', company_name.lower())
+
+
+def topic_key(topic):
+    """
+    Case-insensitive topic identifier used by the topic index.
+    """
+    return topic.strip().lower()
+
+
+def encode_report(result):
+    """
+    Serialize a report compactly (same encoding the API sends to clients).
+    """
+    return json.dumps(result, ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+
+
+class ReportStore:
+    """
+    SQLite-backed history of analysis runs (WAL mode, so the API can read while cron writes).
+    Every run keeps its full report plus one row per article, both indexed by company and time,
+    so history and time-range queries never have to load whole reports. A small `latest` table,
+    updated in the same transaction as each save, indexes the newest run of every company for
+    per-request lookups and the all-companies summary, and `topic_postings` is an inverted index
+    from topic to the articles of those newest runs.
+    """
+    def __init__(self, path=DB_PATH):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = self._connect()
+        conn.executescript(SCHEMA)
+        with conn:
+            conn.execute(BACKFILL_LATEST)
+            conn.execute(BACKFILL_TOPICS)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def save_report(self, company, result, created_at=None):
+        """
+        Append one analysis run for a company. Returns the new run id.
+        """
+        created_at = time.time() if created_at is None else created_at
+        key = company_key(company)
+        dist = result.get("Comparative Sentiment Score", {}).get("Sentiment Distribution", {})
+        conn = self._connect()
+        with metrics.timer("store_write"), conn:
+            cur = conn.execute(
+                "INSERT INTO runs (company_key, company, created_at, positive, negative, neutral,"
+                " final_sentiment, report_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, company, created_at, dist.get("Positive", 0), dist.get("Negative", 0),
+                 dist.get("Neutral", 0), result.get("Final Sentiment Analysis"), encode_report(result)))
+            run_id = cur.lastrowid
+            # Older runs (e.g. imported pickles) never replace a newer latest entry
+            conn.execute(
+                "INSERT INTO latest (company_key, company, run_id, created_at, positive, negative, neutral,"
+                " final_sentiment) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT (company_key) DO UPDATE SET company = excluded.company,"
+                " run_id = excluded.run_id, created_at = excluded.created_at, positive = excluded.positive,"
+                " negative = excluded.negative, neutral = excluded.neutral,"
+                " final_sentiment = excluded.final_sentiment"
+                " WHERE excluded.created_at >= latest.created_at",
+                (key, company, run_id, created_at, dist.get("Positive", 0), dist.get("Negative", 0),
+                 dist.get("Neutral", 0), result.get("Final Sentiment Analysis")))
+            conn.executemany(
+                "INSERT INTO articles (run_id, position, company_key, created_at, title, summary,"
+                " sentiment, topics_json) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(run_id, position, key, created_at, art.get("Title"), art.get("Summary"),
+                  art.get("Sentiment"), json.dumps(art.get("Topics", [])))
+                 for position, art in enumerate(result.get("Articles", []))])
+            # Re-point the company's topic postings at this run if it became the latest one
+            if conn.execute("SELECT run_id FROM latest WHERE company_key = ?", (key,)).fetchone()[0] == run_id:
+                conn.execute("DELETE FROM topic_postings WHERE company_key = ?", (key,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO topic_postings (topic_key, topic, company_key, company, run_id,"
+                    " position, title, sentiment, created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(topic_key(topic), topic.strip(), key, company, run_id, position, art.get("Title"),
+                      art.get("Sentiment"), created_at)
+                     for position, art in enumerate(result.get("Articles", []))
+                     for topic in art.get("Topics", []) if topic.strip()])
+        return run_id
+
+    def latest_run_id(self, company):
+        """
+        Id of the most recent run for a company, or None. Cheap enough to call per request.
+        """
+        with metrics.timer("store_read", query="latest_run_id"):
+            row = self._connect().execute(
+                "SELECT run_id FROM latest WHERE company_key = ?", (company_key(company),)).fetchone()
+        return row["run_id"] if row else None
+
+    def latest_run_ids(self, companies):
+        """
+        {company_key: run_id} of the most recent run for each of the given companies that has one.
+        """
+        keys = list(dict.fromkeys(company_key(c) for c in companies))
+        run_ids = {}
+        conn = self._connect()
+        with metrics.timer("store_read", query="latest_run_ids"):
+            for i in range(0, len(keys), _IN_CHUNK):
+                chunk = keys[i:i + _IN_CHUNK]
+                run_ids.update(conn.execute(
+                    f"SELECT company_key, run_id FROM latest WHERE company_key IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall())
+        return run_ids
+
+    def report_json(self, run_id):
+        """
+        The stored JSON text of one run's report, or None.
+        """
+        with metrics.timer("store_read", query="report_json"):
+            row = self._connect().execute("SELECT report_json FROM runs WHERE id = ?", (run_id,)).fetchone()
+        return row["report_json"] if row else None
+
+    def report_jsons(self, run_ids):
+        """
+        {run_id: report JSON text} for several runs in one pass.
+        """
+        run_ids = list(run_ids)
+        reports = {}
+        conn = self._connect()
+        with metrics.timer("store_read", query="report_jsons"):
+            for i in range(0, len(run_ids), _IN_CHUNK):
+                chunk = run_ids[i:i + _IN_CHUNK]
+                reports.update(conn.execute(
+                    f"SELECT id, report_json FROM runs WHERE id IN ({','.join('?' * len(chunk))})",
+                    chunk).fetchall())
+        return reports
+
+    def latest_version(self):
+        """
+        (highest latest run id, number of companies): changes whenever any company's latest run does.
+        """
+        row = self._connect().execute("SELECT MAX(run_id), COUNT(*) FROM latest").fetchone()
+        return row[0], row[1]
+
+    def summaries(self, companies=None, limit=None, offset=0):
+        """
+        Latest sentiment distribution and final sentiment per company, ordered by company key,
+        straight from the latest-run index (no report is loaded). Returns (total, rows).
+        """
+        conn = self._connect()
+        with metrics.timer("store_read", query="summaries"):
+            if companies is None:
+                total = conn.execute("SELECT COUNT(*) FROM latest").fetchone()[0]
+                rows = conn.execute(
+                    "SELECT company, run_id, created_at, positive, negative, neutral, final_sentiment"
+                    " FROM latest ORDER BY company_key LIMIT ? OFFSET ?",
+                    (-1 if limit is None else limit, offset)).fetchall()
+            else:
+                keys = sorted(set(company_key(c) for c in companies))
+                rows = []
+                for i in range(0, len(keys), _IN_CHUNK):
+                    chunk = keys[i:i + _IN_CHUNK]
+                    rows += conn.execute(
+                        "SELECT company, run_id, created_at, positive, negative, neutral, final_sentiment"
+                        f" FROM latest WHERE company_key IN ({','.join('?' * len(chunk))}) ORDER BY company_key",
+                        chunk).fetchall()
+                total = len(rows)
+                rows = rows[offset:] if limit is None else rows[offset:offset + limit]
+        return total, rows
+
+    def latest_report(self, company):
+        """
+        The most recent report for a company as a dict, or None.
+        """
+        run_id = self.latest_run_id(company)
+        if run_id is None:
+            return None
+        return json.loads(self.report_json(run_id))
+
+    def history(self, company, since=None, until=None, limit=100, offset=0):
+        """
+        Runs for a company (newest first) between two unix timestamps, without the article bodies.
+        """
+        with metrics.timer("store_read", query="history"):
+            rows = self._connect().execute(
+                "SELECT id, created_at, positive, negative, neutral, final_sentiment FROM runs"
+                " WHERE company_key = ? AND created_at >= ? AND created_at <= ?"
+                " ORDER BY created_at DESC, id DESC LIMIT ? OFFSET ?",
+                (company_key(company), since if since is not None else float("-inf"),
+                 until if until is not None else float("inf"), limit, offset)).fetchall()
+        return [{
+            "run_id": row["id"],
+            "created_at": row["created_at"],
+            "Sentiment Distribution": {"Positive": row["positive"], "Negative": row["negative"],
+                                       "Neutral": row["neutral"]},
+            "Final Sentiment Analysis": row["final_sentiment"],
+        } for row in rows]
+
+    def articles(self, company, since=None, until=None, sentiment=None, limit=100, offset=0):
+        """
+        Analyzed articles for a company (newest run first) between two unix timestamps.
+        """
+        query = ("SELECT run_id, position, created_at, title, summary, sentiment, topics_json FROM articles"
+                 " WHERE company_key = ? AND created_at >= ? AND created_at <= ?")
+        params = [company_key(company), since if since is not None else float("-inf"),
+                  until if until is not None else float("inf")]
+        if sentiment:
+            query += " AND sentiment = ?"
+            params.append(sentiment)
+        query += " ORDER BY created_at DESC, run_id DESC, position LIMIT ? OFFSET ?"
+        params += [limit, offset]
+        with metrics.timer("store_read", query="articles"):
+            rows = self._connect().execute(query, params).fetchall()
+        return [{
+            "run_id": row["run_id"],
+            "created_at": row["created_at"],
+            "Title": row["title"],
+            "Summary": row["summary"],
+            "Sentiment": row["sentiment"],
+            "Topics": json.loads(row["topics_json"] or "[]"),
+        } for row in rows]
+
+    def topic_companies(self, topic, since=None, limit=100, offset=0):
+        """
+        Companies whose latest run has articles on `topic` (optionally only runs since a unix
+        timestamp), ordered by company, with those articles. Returns (total_companies, companies).
+        """
+        key = topic_key(topic)
+        since = since if since is not None else float("-inf")
+        conn = self._connect()
+        with metrics.timer("store_read", query="topic_companies"):
+            total = conn.execute(
+                "SELECT COUNT(DISTINCT company_key) FROM topic_postings WHERE topic_key = ? AND created_at >= ?",
+                (key, since)).fetchone()[0]
+            rows = conn.execute(
+                "SELECT p.company_key, p.company, p.run_id, p.position, p.title, p.sentiment, p.created_at"
+                " FROM topic_postings p JOIN (SELECT DISTINCT company_key FROM topic_postings"
+                " WHERE topic_key = ? AND created_at >= ? ORDER BY company_key LIMIT ? OFFSET ?) c"
+                " USING (company_key) WHERE p.topic_key = ? ORDER BY p.company_key, p.position",
+                (key, since, limit, offset, key)).fetchall()
+        companies = []
+        for row in rows:
+            if not companies or companies[-1]["company_key"] != row["company_key"]:
+                companies.append({"company_key": row["company_key"], "company": row["company"],
+                                  "run_id": row["run_id"], "created_at": row["created_at"], "articles": []})
+            companies[-1]["articles"].append({"position": row["position"], "title": row["title"],
+                                              "sentiment": row["sentiment"]})
+        return total, companies
+
+    def trending_topics(self, since=None, min_companies=1, limit=20):
+        """
+        Topics ranked by how many companies' latest runs (optionally since a unix timestamp)
+        mention them, with article counts by sentiment. Reads only the topic index.
+        """
+        with metrics.timer("store_read", query="trending_topics"):
+            rows = self._connect().execute(
+                "SELECT topic_key, MAX(topic) AS topic, COUNT(DISTINCT company_key) AS companies,"
+                " COUNT(*) AS articles, SUM(sentiment = 'Positive') AS positive,"
+                " SUM(sentiment = 'Negative') AS negative, SUM(sentiment = 'Neutral') AS neutral"
+                " FROM topic_postings WHERE created_at >= ? GROUP BY topic_key HAVING companies >= ?"
+                " ORDER BY companies DESC, articles DESC, topic_key LIMIT ?",
+                (since if since is not None else float("-inf"), min_companies, limit)).fetchall()
+        return [dict(row) for row in rows]
+
+    def add_hits(self, counts, at=None):
+        """
+        Add API request counts ({company: hits}) to the hourly popularity buckets.
+        """
+        hour = int((time.time() if at is None else at) // 3600)
+        rows = [(company_key(company), hour, hits) for company, hits in counts.items() if hits]
+        conn = self._connect()
+        with metrics.timer("store_write", query="add_hits"), conn:
+            conn.executemany(
+                "INSERT INTO company_hits (company_key, hour, hits) VALUES (?, ?, ?)"
+                " ON CONFLICT (company_key, hour) DO UPDATE SET hits = hits + excluded.hits", rows)
+            conn.execute("DELETE FROM company_hits WHERE hour < ?", (hour - HITS_RETENTION_HOURS,))
+
+    def popularity(self, since):
+        """
+        {company_key: API requests} counted since a unix timestamp (to the hour).
+        """
+        with metrics.timer("store_read", query="popularity"):
+            rows = self._connect().execute(
+                "SELECT company_key, SUM(hits) FROM company_hits WHERE hour >= ? GROUP BY company_key",
+                (int(since // 3600),)).fetchall()
+        return dict(rows)
+
+    def import_pickles(self, directory=os.path.join('data', 'output')):
+        """
+        One-off migration of legacy <company>.pkl reports into the store. Returns the number imported.
+        Only run this on pickle files you produced yourself; unpickling executes arbitrary code.
+        """
+        imported = 0
+        for name in sorted(os.listdir(directory)):
+            if not name.endswith(".pkl"):
+                continue
+            path = os.path.join(directory, name)
+            try:
+                with open(path, 'rb') as f:
+                    result = pickle.load(f)
+                company = result.get("Company") or name[:-4]
+                self.save_report(company, result, created_at=os.path.getmtime(path))
+                imported += 1
+            except Exception as e:
+                print(f"Could not import {path}: {e}")
+        return imported
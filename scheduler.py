@@ -0,0 +1,199 @@
+import math
+import os
+
+# Longest gap between refreshes of a company (one with no recent news and no API traffic)
+REFRESH_INTERVAL = float(os.environ.get("SCHEDULER_INTERVAL", 3600))
+# Shortest gap, however hot a company is
+MIN_INTERVAL = float(os.environ.get("SCHEDULER_MIN_INTERVAL", 300))
+# Refresh rate multiplier per new feed item per hour, and per e-fold of API requests in the window
+VELOCITY_WEIGHT = float(os.environ.get("SCHEDULER_VELOCITY_WEIGHT", 0.5))
+POPULARITY_WEIGHT = float(os.environ.get("SCHEDULER_POPULARITY_WEIGHT", 1.0))
+POPULARITY_WINDOW = float(os.environ.get("SCHEDULER_POPULARITY_WINDOW", 24 * 3600))
+# Smoothing of the new-items-per-hour estimate (weight of the latest poll)
+VELOCITY_ALPHA = 0.3
+
+
+class CompanyState:
+    """
+    What the scheduler knows about one company.
+    """
+    def __init__(self, company, checked_at=None, has_report=False):
+        self.company = company
+        self.checked_at = checked_at    # last poll (or last stored report), unix time
+        self.refreshed_at = checked_at  # last new report
+        self.has_report = has_report
+        self.velocity = 0.0             # smoothed new feed items per hour
+        self.popularity = 0             # API requests in the popularity window
+        self.known_links = None         # feed links covered by the last completed refresh
+        self.seen_links = None          # feed links seen at the last poll
+        self.in_flight = False
+        self.failures = 0               # failed refreshes in a row
+        self.retry_at = None            # not retried before this time after a failure
+
+
+class RefreshScheduler:
+    """
+    Priority scheduler for the refresh daemon. Every company gets a refresh interval that
+    shrinks from `interval` (towards `min_interval`) with its news velocity (new feed items per
+    hour, smoothed over polls) and its API popularity. A company is due once that interval has
+    passed since its last poll; among due companies the most overdue relative to its interval
+    goes first, and companies never polled go before all others. With a crawl budget too small
+    to keep up, hot companies therefore stay fresh and the cold ones absorb the lag. A company
+    whose refresh failed is retried after an exponential backoff (min_interval, doubling per
+    failure in a row, at most `interval`) instead of at once.
+    """
+    def __init__(self, interval=REFRESH_INTERVAL, min_interval=MIN_INTERVAL,
+                 velocity_weight=VELOCITY_WEIGHT, popularity_weight=POPULARITY_WEIGHT):
+        self.interval = interval
+        self.min_interval = min(min_interval, interval)
+        self.velocity_weight = velocity_weight
+        self.popularity_weight = popularity_weight
+        self.states = {}
+
+    def set_companies(self, companies, last_reports=None):
+        """
+        Track exactly these companies, keeping the state of those already tracked.
+        `last_reports` maps company name to the time of its newest stored report.
+        """
+        last_reports = last_reports or {}
+        states = {}
+        for company in companies:
+            state = self.states.get(company)
+            if state is None:
+                last = last_reports.get(company)
+                state = CompanyState(company, checked_at=last, has_report=last is not None)
+            states[company] = state
+        self.states = states
+
+    def set_popularity(self, hits):
+        """
+        Update API popularity from {company: requests in the popularity window}.
+        """
+        for company, state in self.states.items():
+            state.popularity = hits.get(company, 0)
+
+    def refresh_interval(self, state):
+        weight = (1 + self.velocity_weight * state.velocity
+                  + self.popularity_weight * math.log1p(state.popularity))
+        return max(self.min_interval, self.interval / weight)
+
+    def _overdue(self, state, now):
+        """
+        (Seconds since the last poll) / (refresh interval); due at 1, never polled is infinite.
+        """
+        if state.checked_at is None:
+            return math.inf
+        return (now - state.checked_at) / self.refresh_interval(state)
+
+    def next_due(self, now):
+        """
+        The company to refresh next, or None if none is due. Marks it in flight.
+        """
+        best, best_key = None, None
+        for state in self.states.values():
+            if state.in_flight or (state.retry_at is not None and now < state.retry_at):
+                continue
+            overdue = self._overdue(state, now)
+            if overdue < 1:
+                continue
+            key = (overdue, state.popularity, state.velocity)
+            if best_key is None or key > best_key:
+                best, best_key = state, key
+        if best is None:
+            return None
+        best.in_flight = True
+        return best.company
+
+    def seconds_until_due(self, now):
+        """
+        Time until the next idle company becomes due (0 if one is due now, None if all are busy).
+        """
+        waits = []
+        for state in self.states.values():
+            if state.in_flight:
+                continue
+            due = state.checked_at + self.refresh_interval(state) if state.checked_at is not None else now
+            if state.retry_at is not None:
+                due = max(due, state.retry_at)
+            waits.append(max(0.0, due - now))
+        return min(waits, default=None)
+
+    def record_poll(self, company, links, new_items, now):
+        """
+        Record a finished feed poll: `links` currently in the feed, `new_items` of them not seen
+        at the previous poll (None when there was nothing to compare with). The links only become
+        known_links once the refresh completes (finish with "saved" or "unchanged").
+        """
+        state = self.states.get(company)
+        if state is None:
+            return
+        if new_items is not None and state.checked_at is not None and now > state.checked_at:
+            rate = new_items * 3600 / (now - state.checked_at)
+            state.velocity = VELOCITY_ALPHA * rate + (1 - VELOCITY_ALPHA) * state.velocity
+        state.seen_links = frozenset(links)
+        state.checked_at = now
+
+    def finish(self, company, now, result):
+        """
+        The company's refresh is over: `result` is "saved" (a new report was stored),
+        "unchanged" (the feed had nothing new), "skipped" (no articles could be scraped; the new
+        feed items are looked at again next time) or "failed" (the poll or a later stage failed;
+        backs off). Only "saved" and "unchanged" make the polled links known.
+        """
+        state = self.states.get(company)
+        if state is None:
+            return
+        state.in_flight = False
+        if result == "failed":
+            state.failures += 1
+            state.retry_at = now + min(self.interval, self.min_interval * 2 ** (state.failures - 1))
+            return
+        state.failures = 0
+        state.retry_at = None
+        if result in ("saved", "unchanged"):
+            state.known_links = state.seen_links
+        if result == "saved":
+            state.has_report = True
+            state.refreshed_at = now
+
+    def status(self, now, top=10):
+        """
+        Queue depth, freshness lag and the most urgent companies, as a JSON-ready dict.
+        """
+        lags, urgent, never, failing = [], [], 0, 0
+        for state in self.states.values():
+            if state.in_flight:
+                continue
+            if state.failures:
+                failing += 1
+            if state.checked_at is None:
+                never += 1
+                continue
+            interval = self.refresh_interval(state)
+            lag = now - state.checked_at - interval
+            if lag > 0:
+                lags.append(lag)
+            urgent.append((lag / interval, state, interval))
+        urgent.sort(key=lambda item: item[0], reverse=True)
+        lags.sort()
+        return {
+            "companies": len(self.states),
+            "in_flight": sum(1 for state in self.states.values() if state.in_flight),
+            "queue_depth": len(lags) + never,
+            "never_polled": never,
+            "failing": failing,
+            "freshness_lag_seconds": {
+                "max": lags[-1] if lags else 0.0,
+                "mean": sum(lags) / len(lags) if lags else 0.0,
+                "p50": lags[len(lags) // 2] if lags else 0.0,
+            },
+            "most_urgent": [{
+                "company": state.company,
+                "refresh_interval": interval,
+                "seconds_since_poll": now - state.checked_at,
+                "seconds_since_report": now - state.refreshed_at if state.refreshed_at is not None else None,
+                "velocity_per_hour": round(state.velocity, 3),
+                "popularity": state.popularity,
+                "failures": state.failures,
+            } for _, state, interval in urgent[:top]],
+        }
@@ -1,32 +1,214 @@
-from gtts import gTTS
-from googletrans import Translator
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 
-def text_to_speech_hindi(text, output_path=None):
+from utils.article_cache import DiskCache, content_hash
+from utils.metrics import metrics
+
+TTS_DIR = os.path.join('data', 'output', 'tts')
+TRANSLATION_CACHE_DIR = os.path.join('data', 'cache', 'translations')
+# A generation lock older than this is assumed to belong to a crashed process
+LOCK_STALE_SECONDS = 120
+
+# gtts and googletrans are imported on first use: most processes that import this module (the
+# API, cron) only look up or queue audio, and both libraries are slow to import
+
+# Translation memo: in memory for this process, on disk across processes and runs
+_translations = {}
+_translation_cache = DiskCache(TRANSLATION_CACHE_DIR)
+
+
+def translate_to_hindi(text):
     """
-    Translate the given English text to Hindi and generate a speech audio file.
-    If output_path is provided, saves the MP3 audio to that path. Otherwise, returns audio bytes.
+    Translate English text to Hindi, memoized by text. Falls back to the original text on failure
+    (failures are not memoized so the next call retries).
     """
+    hindi_text = _translations.get(text)
+    if hindi_text is not None:
+        return hindi_text
+    cached = _translation_cache.get(text)
+    if cached is not None:
+        _translations[text] = cached["hi"]
+        return cached["hi"]
+    from googletrans import Translator
     translator = Translator()
     try:
         # Translate text to Hindi
-        translation = translator.translate(text, dest='hi')
+        with metrics.timer("tts_translate"):
+            translation = translator.translate(text, dest='hi')
         hindi_text = translation.text
     except Exception as e:
         print(f"Translation to Hindi failed: {e}")
-        hindi_text = text  # Fallback to original text if translation fails
+        return text  # Fallback to original text if translation fails
+    _translations[text] = hindi_text
+    try:
+        _translation_cache.put(text, {"en": text, "hi": hindi_text})
+    except OSError as e:
+        print(f"Could not cache translation: {e}")
+    return hindi_text
+
+
+def text_to_speech_hindi(text, output_path=None):
+    """
+    Translate the given English text to Hindi and generate a speech audio file.
+    If output_path is provided, saves the MP3 audio to that path. Otherwise, returns audio bytes.
+    """
+    from gtts import gTTS
+    hindi_text = translate_to_hindi(text)
     try:
-        # Generate speech using gTTS
+        # Generate speech using gTTS (the request to Google happens in write_to_fp)
         tts = gTTS(hindi_text, lang='hi')
         if output_path:
-            tts.save(output_path)
+            # Write to a temp file first so readers never see a partial mp3
+            directory = os.path.dirname(output_path) or '.'
+            fd, tmp_path = tempfile.mkstemp(dir=directory, suffix='.mp3.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f, metrics.timer("tts_synthesize"):
+                    tts.write_to_fp(f)
+                os.replace(tmp_path, output_path)
+            finally:
+                if os.path.exists(tmp_path):
+                    os.remove(tmp_path)
             return output_path
         else:
             # Return audio data in memory
             from io import BytesIO
             fp = BytesIO()
-            tts.write_to_fp(fp)
+            with metrics.timer("tts_synthesize"):
+                tts.write_to_fp(fp)
             fp.seek(0)
             return fp.read()
     except Exception as e:
         print(f"TTS generation failed: {e}")
         return None
+
+
+def tts_key(text):
+    """
+    Content address of the audio for a piece of text.
+    """
+    return content_hash(text)
+
+
+def audio_path(key, directory=TTS_DIR):
+    return os.path.join(directory, f"{key}.mp3")
+
+
+class TTSJobManager:
+    """
+    Runs TTS generation in background threads, one job per distinct text.
+    Audio is stored under its content hash, so identical texts share one file, and concurrent
+    requests for the same text (in this process, or in other processes via a lock file) are
+    collapsed into a single translate+synthesize call.
+    """
+    def __init__(self, directory=TTS_DIR, max_workers=2):
+        self.directory = directory
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        self._lock = threading.Lock()
+        self._jobs = {}    # key -> Future
+        self._failed = {}  # key -> error message
+
+    def submit(self, text):
+        """
+        Make sure audio for `text` exists or is being generated. Returns the job key.
+        """
+        key = tts_key(text)
+        if os.path.exists(audio_path(key, self.directory)):
+            return key
+        with self._lock:
+            future = self._jobs.get(key)
+            if future is None or future.done():
+                self._failed.pop(key, None)
+                self._jobs[key] = self._executor.submit(self._generate, key, text)
+        return key
+
+    def status(self, key):
+        """
+        One of "ready", "pending", "failed" or "unknown".
+        """
+        if os.path.exists(audio_path(key, self.directory)):
+            return "ready"
+        with self._lock:
+            if key in self._failed:
+                return "failed"
+            future = self._jobs.get(key)
+        if future is not None and not future.done():
+            return "pending"
+        if self._locked_elsewhere(key):
+            return "pending"
+        return "unknown"
+
+    def error(self, key):
+        with self._lock:
+            return self._failed.get(key)
+
+    def path(self, key):
+        return audio_path(key, self.directory)
+
+    def wait(self, key, timeout=None):
+        """
+        Block until the job for `key` finishes (used by cron and the Streamlit app). Returns the status.
+        """
+        with self._lock:
+            future = self._jobs.get(key)
+        if future is not None:
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                with self._lock:
+                    self._failed[key] = str(e)
+        return self.status(key)
+
+    def generate(self, text, timeout=None):
+        """
+        Submit and wait. Returns the audio path, or None if generation failed.
+        """
+        key = self.submit(text)
+        return self.path(key) if self.wait(key, timeout) == "ready" else None
+
+    def _lock_path(self, key):
+        return audio_path(key, self.directory) + ".lock"
+
+    def _locked_elsewhere(self, key):
+        try:
+            return time.time() - os.path.getmtime(self._lock_path(key)) < LOCK_STALE_SECONDS
+        except OSError:
+            return False
+
+    def _generate(self, key, text):
+        path = audio_path(key, self.directory)
+        os.makedirs(self.directory, exist_ok=True)
+        lock_path = self._lock_path(key)
+        # Cross-process single flight: another worker holding a fresh lock is already generating
+        while True:
+            try:
+                fd = os.open(lock_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+                os.close(fd)
+                break
+            except FileExistsError:
+                if not self._locked_elsewhere(key):
+                    # Stale lock from a crashed process
+                    try:
+                        os.remove(lock_path)
+                    except OSError:
+                        pass
+                    continue
+                while self._locked_elsewhere(key) and not os.path.exists(path):
+                    time.sleep(0.5)
+                if os.path.exists(path):
+                    return path
+        try:
+            if os.path.exists(path):
+                return path
+            if not text_to_speech_hindi(text, path):
+                with self._lock:
+                    self._failed[key] = "TTS conversion failed."
+                return None
+            return path
+        finally:
+            try:
+                os.remove(lock_path)
+            except OSError:
+                pass
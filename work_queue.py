@@ -0,0 +1,175 @@
+import os
+import sqlite3
+import threading
+import time
+
+from utils.metrics import metrics
+from utils.report_store import company_key
+
+QUEUE_PATH = os.path.join('data', 'work_queue.db')
+# A claimed company is handed to another worker if its lease is not renewed for this long
+LEASE_SECONDS = float(os.environ.get("WORK_LEASE_SECONDS", 300))
+# Companies that failed this many times in a round are given up on until the next round
+MAX_ATTEMPTS = int(os.environ.get("WORK_MAX_ATTEMPTS", 3))
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    company_key TEXT PRIMARY KEY,
+    company TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    state TEXT NOT NULL,
+    owner TEXT,
+    lease_expires REAL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tasks_state ON tasks (state, lease_expires);
+"""
+
+
+class WorkQueue:
+    """
+    Lease-based queue of companies shared by cron workers (processes on one host, or on several
+    hosts that share the database file on a filesystem with working locks).
+
+    Each round of refreshes is enqueued by every worker (enqueueing is idempotent per round). A
+    worker claims one company at a time under a lease, renews its leases while it works and
+    completes them at the end; a lease that expires (crashed or stalled worker) is claimed by
+    the next worker that asks. Delivery is at least once: a stalled worker that comes back after
+    losing its lease may still save its result, which only adds one more run to the store.
+    """
+    def __init__(self, path=QUEUE_PATH, lease_seconds=LEASE_SECONDS, max_attempts=MAX_ATTEMPTS):
+        self.path = path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self._local = threading.local()
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._connect().executescript(SCHEMA)
+
+    def _connect(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Autocommit mode: every write below opens its own BEGIN IMMEDIATE transaction
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _write(self, fn):
+        """
+        Run fn(conn) in an immediate (write-locked) transaction and return its result.
+        """
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            result = fn(conn)
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+        return result
+
+    def enqueue(self, companies, round_id):
+        """
+        Make `companies` pending for round `round_id`. Companies already enqueued for this round
+        (or a later one) are left alone, and a company still leased from an earlier round keeps
+        its lease. Returns the number of companies (re)armed.
+        """
+        now = time.time()
+        rows = [(company_key(c), c, round_id, now) for c in dict.fromkeys(companies)]
+
+        def enqueue_rows(conn):
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT INTO tasks (company_key, company, round, state, attempts, updated_at)"
+                " VALUES (?, ?, ?, 'pending', 0, ?)"
+                " ON CONFLICT (company_key) DO UPDATE SET company = excluded.company, round = excluded.round,"
+                " attempts = 0, error = NULL, updated_at = excluded.updated_at,"
+                " state = CASE WHEN state = 'leased' THEN 'leased' ELSE 'pending' END"
+                " WHERE excluded.round > tasks.round", rows)
+            return conn.total_changes - before
+
+        with metrics.timer("work_queue", op="enqueue"):
+            return self._write(enqueue_rows)
+
+    def claim(self, owner):
+        """
+        Lease the next pending company (or one whose lease expired) to `owner`. Returns the
+        company name, or None if there is nothing to claim right now.
+        """
+        now = time.time()
+
+        def claim_one(conn):
+            # Leases that expired on their last allowed attempt (the company keeps killing or
+            # stalling its workers) are given up on instead of being handed out again
+            conn.execute(
+                "UPDATE tasks SET state = 'failed', owner = NULL, lease_expires = NULL, error = 'lease expired',"
+                " updated_at = ? WHERE state = 'leased' AND lease_expires < ? AND attempts >= ?",
+                (now, now, self.max_attempts))
+            row = conn.execute(
+                "SELECT company_key, company, state FROM tasks WHERE state = 'pending'"
+                " OR (state = 'leased' AND lease_expires < ?) ORDER BY state DESC, company_key LIMIT 1",
+                (now,)).fetchone()
+            if row is None:
+                return None
+            conn.execute(
+                "UPDATE tasks SET state = 'leased', owner = ?, lease_expires = ?, attempts = attempts + 1,"
+                " updated_at = ? WHERE company_key = ?", (owner, now + self.lease_seconds, now, row[0]))
+            return row
+
+        with metrics.timer("work_queue", op="claim"):
+            row = self._write(claim_one)
+        if row is None:
+            return None
+        metrics.inc("work_leases", result="taken_over" if row[2] == "leased" else "claimed")
+        return row[1]
+
+    def renew(self, owner):
+        """
+        Extend every lease held by `owner`. Returns how many it still holds.
+        """
+        now = time.time()
+        with metrics.timer("work_queue", op="renew"):
+            return self._write(lambda conn: conn.execute(
+                "UPDATE tasks SET lease_expires = ?, updated_at = ? WHERE owner = ? AND state = 'leased'",
+                (now + self.lease_seconds, now, owner)).rowcount)
+
+    def complete(self, company, owner, ok=True, error=None):
+        """
+        Finish `owner`'s lease on a company: done, or back to pending for another attempt after a
+        failure (failed for this round once max_attempts is reached). Returns False if the lease
+        had already been lost to another worker.
+        """
+        now = time.time()
+        if ok:
+            state_sql, params = "'done'", ()
+        else:
+            state_sql, params = "CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END", (self.max_attempts,)
+        with metrics.timer("work_queue", op="complete"):
+            updated = self._write(lambda conn: conn.execute(
+                f"UPDATE tasks SET state = {state_sql}, owner = NULL, lease_expires = NULL, error = ?,"
+                " updated_at = ? WHERE company_key = ? AND owner = ? AND state = 'leased'",
+                (*params, error, now, company_key(company), owner)).rowcount)
+        if not updated:
+            metrics.inc("work_leases", result="lost")
+        return bool(updated)
+
+    def unfinished(self):
+        """
+        Number of companies still pending or leased (by any worker).
+        """
+        return self._connect().execute(
+            "SELECT COUNT(*) FROM tasks WHERE state IN ('pending', 'leased')").fetchone()[0]
+
+    def status(self):
+        """
+        {state: count} over all companies, plus the newest round.
+        """
+        conn = self._connect()
+        counts = dict(conn.execute("SELECT state, COUNT(*) FROM tasks GROUP BY state").fetchall())
+        counts["round"] = conn.execute("SELECT MAX(round) FROM tasks").fetchone()[0]
+        return counts